@@ -0,0 +1,39 @@
+"""
+gunicorn settings, loaded automatically when gunicorn runs from this
+directory (as the Procfile and ``manage.py loadtest`` do).
+"""
+import os
+import shutil
+import tempfile
+
+# Created in on_starting when METRICS_DIR isn't set, removed in on_exit
+_metrics_dir_created = None
+
+
+def on_starting(server):
+    # Workers share their metrics through files (see recipe_app/metrics.py);
+    # values left over from a previous run must not be added to this one's
+    global _metrics_dir_created
+    from recipe_app.metrics import clear_directory
+
+    if not os.environ.get("METRICS_DIR"):
+        _metrics_dir_created = os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="recipe-metrics-")
+    clear_directory(os.environ["METRICS_DIR"])
+
+
+def post_worker_init(worker):
+    # Start the chart worker processes now rather than on the first search
+    from recipes.chart_pool import start_pool
+
+    start_pool()
+
+
+def child_exit(server, worker):
+    from recipe_app.metrics import archive_process
+
+    archive_process(os.environ["METRICS_DIR"], worker.pid)
+
+
+def on_exit(server):
+    if _metrics_dir_created:
+        shutil.rmtree(_metrics_dir_created, ignore_errors=True)
@@ -0,0 +1,295 @@
+"""
+Prometheus-format metrics shared by every worker process.
+
+Metrics are declared once at module level (see the bottom of this file)
+and updated from anywhere::
+
+    from recipe_app import metrics
+
+    metrics.FAVOURITE_TOGGLES.inc(action="add")
+    metrics.CHART_RENDER_SECONDS.observe(0.12, chart="bar")
+
+With METRICS_DIR set, each process keeps its values in its own
+memory-mapped file in that directory and ``/metrics`` sums the files of
+all processes, so gunicorn workers report as one. gunicorn.conf.py
+points METRICS_DIR at a fresh directory (unless it is set), clears it
+when the server starts and, when a worker exits, folds its file into an
+archive file so its counts are kept without its file piling up. Without
+METRICS_DIR values stay in-process, which is enough for ``runserver``.
+
+Only counters and histograms are supported; both sum correctly across
+processes. p99 latency of the searches, for alerting::
+
+    histogram_quantile(0.99, sum by (le, view) (rate(
+        recipe_request_duration_seconds_bucket{
+            view=~"recipes:(advanced_search|search_recipes)"}[5m])))
+"""
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+# Latency buckets (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Values of the processes that have exited (see archive_process)
+ARCHIVE_FILE = "metrics_archive.db"
+
+
+class MemoryStore:
+    """Sample values of this process only."""
+
+    def __init__(self):
+        self.values = {}
+
+    def inc(self, key, amount):
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def items(self):
+        return list(self.values.items())
+
+
+class MmapStore:
+    """
+    Sample values of this process in a memory-mapped file, readable by
+    other processes. Layout: an 8-byte "used bytes" header followed by
+    entries of [4-byte key length][key, padded to 8 bytes][8-byte double].
+    New entries are written before the header is moved past them, so a
+    reader never sees a half-written entry.
+    """
+
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.file = open(self.path, "a+b")
+        if os.fstat(self.file.fileno()).st_size == 0:
+            self.file.truncate(self.INITIAL_SIZE)
+            self.map = mmap.mmap(self.file.fileno(), self.INITIAL_SIZE)
+            struct.pack_into("q", self.map, 0, 8)
+        else:
+            self.map = mmap.mmap(self.file.fileno(), 0)
+        self.offsets = {key: offset for key, offset, _ in read_entries(self.map)}
+
+    def inc(self, key, amount):
+        offset = self.offsets.get(key)
+        if offset is None:
+            offset = self.append(key)
+        value = struct.unpack_from("d", self.map, offset)[0]
+        struct.pack_into("d", self.map, offset, value + amount)
+
+    def append(self, key):
+        encoded = key.encode("utf-8")
+        header = (4 + len(encoded) + 7) & ~7
+        used = struct.unpack_from("q", self.map, 0)[0]
+        needed = used + header + 8
+        if needed > len(self.map):
+            size = len(self.map)
+            while size < needed:
+                size *= 2
+            self.map.close()
+            self.file.truncate(size)
+            self.map = mmap.mmap(self.file.fileno(), size)
+        struct.pack_into(f"i{len(encoded)}s", self.map, used, len(encoded), encoded)
+        struct.pack_into("d", self.map, used + header, 0.0)
+        struct.pack_into("q", self.map, 0, needed)
+        self.offsets[key] = used + header
+        return used + header
+
+    def items(self):
+        return [(key, value) for key, _, value in read_entries(self.map)]
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def read_entries(buffer):
+    """Yield (key, value offset, value) for every entry in a store's bytes."""
+    used = struct.unpack_from("q", buffer, 0)[0]
+    position = 8
+    while position < used:
+        length = struct.unpack_from("i", buffer, position)[0]
+        key = bytes(buffer[position + 4:position + 4 + length]).decode("utf-8")
+        offset = position + ((4 + length + 7) & ~7)
+        yield key, offset, struct.unpack_from("d", buffer, offset)[0]
+        position = offset + 8
+
+
+def clear_directory(directory):
+    """Remove every process's file (when the server starts)."""
+    for path in Path(directory).glob("metrics_*.db"):
+        path.unlink()
+
+
+def archive_process(directory, pid):
+    """
+    Add the values of process ``pid``, which has exited, to the archive
+    file and remove its own file. Counters and histograms keep their
+    totals and the directory doesn't grow with every restarted worker.
+    Only one process (gunicorn's master) may call this.
+    """
+    path = Path(directory) / f"metrics_{pid}.db"
+    if not path.exists():
+        return
+    data = path.read_bytes()
+    if len(data) >= 8:
+        archive = MmapStore(Path(directory) / ARCHIVE_FILE)
+        try:
+            for key, _, value in read_entries(data):
+                archive.inc(key, value)
+        finally:
+            archive.close()
+    path.unlink()
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self._store = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def directory(self):
+        return getattr(settings, "METRICS_DIR", None)
+
+    def store(self):
+        # Opened lazily (and again after a fork) so each process gets its own file
+        if self._pid != os.getpid():
+            directory = self.directory()
+            if directory:
+                Path(directory).mkdir(parents=True, exist_ok=True)
+                self._store = MmapStore(Path(directory) / f"metrics_{os.getpid()}.db")
+            else:
+                self._store = MemoryStore()
+            self._pid = os.getpid()
+        return self._store
+
+    def inc(self, key, amount=1.0):
+        with self._lock:
+            self.store().inc(key, amount)
+
+    def collect(self):
+        """Sample values summed over every process."""
+        directory = self.directory()
+        if not directory:
+            with self._lock:
+                return dict(self.store().items())
+        totals = {}
+        for path in Path(directory).glob("metrics_*.db"):
+            data = path.read_bytes()
+            if len(data) < 8:
+                continue
+            for key, _, value in read_entries(data):
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def reset(self):
+        """Forget this process's values (used by tests)."""
+        with self._lock:
+            self._store = None
+            self._pid = None
+
+    def exposition(self):
+        """All metrics in the Prometheus text format."""
+        samples = self.collect()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            names = {f"{metric.name}{suffix}" for suffix in metric.suffixes}
+            for key in (k for k in samples if k.split("{", 1)[0] in names):
+                lines.append(f"{key} {format_value(samples[key])}")
+        return "\n".join(lines) + "\n"
+
+
+def format_value(value):
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def sample_key(name, labels):
+    """A sample's name and labels as written in the exposition format."""
+    if not labels:
+        return name
+    escaped = (
+        (label, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for label, value in labels.items()
+    )
+    return name + "{" + ",".join(f'{label}="{value}"' for label, value in escaped) + "}"
+
+
+class Counter:
+    kind = "counter"
+    suffixes = ("",)
+
+    def __init__(self, name, documentation, registry):
+        self.name = f"{name}_total"
+        self.documentation = documentation
+        self.registry = registry
+        registry.register(self)
+
+    def inc(self, amount=1.0, **labels):
+        self.registry.inc(sample_key(self.name, dict(sorted(labels.items()))), amount)
+
+
+class Histogram:
+    kind = "histogram"
+    suffixes = ("_bucket", "_sum", "_count")
+
+    def __init__(self, name, documentation, registry, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self.registry = registry
+        registry.register(self)
+
+    def observe(self, value, **labels):
+        labels = dict(sorted(labels.items()))
+        for bound in self.buckets:
+            # Every bucket gets a sample, even when it stays at zero
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            self.registry.inc(
+                sample_key(f"{self.name}_bucket", {**labels, "le": le}),
+                1.0 if value <= bound else 0.0,
+            )
+        self.registry.inc(sample_key(f"{self.name}_sum", labels), value)
+        self.registry.inc(sample_key(f"{self.name}_count", labels))
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = Histogram(
+    "recipe_request_duration_seconds", "Time to handle a request, by view.", REGISTRY
+)
+REQUESTS = Counter("recipe_requests", "Responses sent, by view and status code.", REGISTRY)
+DB_QUERIES = Counter("recipe_db_queries", "Database queries run, by view.", REGISTRY)
+DB_SECONDS = Counter("recipe_db_query_seconds", "Time spent in database queries, by view.", REGISTRY)
+CHART_RENDER_SECONDS = Histogram(
+    "recipe_chart_render_seconds", "Time to draw one advanced-search chart.", REGISTRY
+)
+CACHE_LOOKUPS = Counter(
+    "recipe_cache_lookups", "Cache lookups by cache and result (hit or miss).", REGISTRY
+)
+FAVOURITE_TOGGLES = Counter(
+    "recipe_favourite_toggles", "Favourite toggle requests, by action.", REGISTRY
+)
+
+
+def observe_request(view, status, seconds, db_queries, db_seconds):
+    REQUEST_SECONDS.observe(seconds, view=view)
+    REQUESTS.inc(view=view, status=status)
+    DB_QUERIES.inc(db_queries, view=view)
+    DB_SECONDS.inc(db_seconds, view=view)
+
+
+def cache_lookup(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
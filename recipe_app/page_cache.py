@@ -0,0 +1,162 @@
+"""
+Full-page cache for anonymous visitors.
+
+Views opt in with the ``cache_anonymous_page`` decorator (on a class-based
+view, apply it to ``dispatch`` with ``method_decorator``)::
+
+    @cache_anonymous_page(version=lambda request, pk: get_recipe_page_version(pk))
+    class RecipeDetailView(DetailView): ...
+
+PageCacheMiddleware sits above the session, auth and template machinery.
+A GET from a visitor without a session or messages cookie (so nothing on
+the page can be theirs) is answered straight from the cache when a copy
+for the same URL and the same ``version`` exists, without touching the
+session, the ORM or the templates. ``version`` is called with the URL's
+keyword arguments and should be a cheap lookup (a version counter in the
+cache); bumping it purges the page.
+
+Entries are fresh for PAGE_CACHE_SECONDS and kept as long again as a
+stale copy. Only one request at a time regenerates a page (a lock taken
+with ``cache.add``, so across workers): while it does, other visitors
+get the stale copy or, for a purged page, wait briefly for the new one.
+Clear the cache on deploy.
+
+The lock and the purges only work if every worker sees the same cache,
+and a hit must cost less than the page, so the middleware is off unless
+the cache is shared and fast (SHARED_CACHE, i.e. Redis).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from . import metrics
+
+DEFAULT_SECONDS = 300
+# Longest a regeneration may hold the lock, and how long others wait on it
+LOCK_TIMEOUT = 10
+POLL_INTERVAL = 0.05
+
+
+def cache_anonymous_page(version=None):
+    """
+    Mark a view as cacheable for anonymous visitors. ``version(request,
+    **kwargs)`` returns the current version of the page's content (None
+    when it only changes on deploy).
+    """
+    def decorator(view):
+        view.page_cache_version = version or (lambda request, **kwargs: None)
+        return view
+
+    return decorator
+
+
+def page_keys(request):
+    """Cache keys for the page at this URL and for its regeneration lock."""
+    digest = hashlib.md5(request.get_full_path().encode(), usedforsecurity=False).hexdigest()
+    return f"pages:{digest}", f"pages:{digest}:lock"
+
+
+def is_anonymous(request):
+    """No session (so not logged in) and no pending flash messages."""
+    return (
+        settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and CookieStorage.cookie_name not in request.COOKIES
+    )
+
+
+def is_cacheable(response):
+    cache_control = response.get("Cache-Control", "")
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and "private" not in cache_control
+        and "no-store" not in cache_control
+    )
+
+
+class PageCacheMiddleware:
+    """Serve cached pages to anonymous visitors (see module docstring)."""
+
+    def __init__(self, get_response):
+        self.timeout = getattr(settings, "PAGE_CACHE_SECONDS", DEFAULT_SECONDS)
+        if not self.timeout:
+            raise MiddlewareNotUsed
+        if not getattr(settings, "SHARED_CACHE", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method != "GET" or not is_anonymous(request):
+            return self.get_response(request)
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return self.get_response(request)
+        version_for = getattr(match.func, "page_cache_version", None)
+        if version_for is None:
+            return self.get_response(request)
+        # For the timing middleware's per-view metrics, even on a hit
+        request.resolver_match = match
+
+        version = version_for(request, **match.kwargs)
+        key, lock_key = page_keys(request)
+        entry = cache.get(key)
+        current = entry is not None and entry["version"] == version
+        if current and entry["fresh_until"] > time.time():
+            return self.cached_response(request, entry, "hit")
+
+        if cache.add(lock_key, True, timeout=LOCK_TIMEOUT):
+            try:
+                response = self.get_response(request)
+                if is_cacheable(response):
+                    self.store(key, version, response)
+            finally:
+                cache.delete(lock_key)
+            metrics.cache_lookup("pages", False)
+            response["X-Page-Cache"] = "miss"
+            return response
+
+        # Another request is regenerating the page
+        if current:
+            return self.cached_response(request, entry, "stale")
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline and cache.get(lock_key):
+            time.sleep(POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None and entry["version"] == version:
+                return self.cached_response(request, entry, "hit")
+        metrics.cache_lookup("pages", False)
+        return self.get_response(request)
+
+    def store(self, key, version, response):
+        entry = {
+            "version": version,
+            "fresh_until": time.time() + self.timeout,
+            "status": response.status_code,
+            "headers": list(response.items()),
+            "content": response.content,
+        }
+        cache.set(key, entry, timeout=self.timeout * 2)
+
+    def cached_response(self, request, entry, outcome):
+        metrics.cache_lookup("pages", True)
+        response = HttpResponse(entry["content"], status=entry["status"])
+        for header, value in entry["headers"]:
+            response[header] = value
+        response["X-Page-Cache"] = outcome
+        last_modified = response.get("Last-Modified")
+        return get_conditional_response(
+            request,
+            etag=response.get("ETag"),
+            last_modified=last_modified and parse_http_date_safe(last_modified),
+            response=response,
+        )
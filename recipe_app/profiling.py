@@ -0,0 +1,174 @@
+"""
+Opt-in per-request profiling for staff users.
+
+Add ``?profile=1`` to a URL (or send an ``X-Profile: 1`` header) while
+logged in as staff and the response is replaced by a plain-text report:
+time per area (ORM/database, templates, pandas, matplotlib, other)
+followed by the busiest functions and their callees from cProfile.
+
+Other modes:
+
+- ``profile=prof`` downloads the raw cProfile data as a ``.prof`` file
+  (open it with snakeviz or ``python -m pstats``); it is also saved to
+  PROFILE_DIR when that setting is set.
+- ``profile=sample`` uses pyinstrument's sampling profiler and returns
+  its HTML report, if pyinstrument is installed.
+
+Everyone else, and every request without the flag (or with a false
+value such as ``profile=0``), goes straight through. Set
+REQUEST_PROFILING = False to remove the middleware entirely. The
+profilers are only imported when a profile is taken.
+"""
+import io
+import marshal
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+
+# Substrings of a function's file path -> reporting area (first match wins)
+AREAS = (
+    ("pandas", ("/pandas/",)),
+    ("matplotlib", ("/matplotlib/",)),
+    ("templates", ("/django/template/", "/django/templatetags/", "/templatetags/")),
+    ("orm", ("/django/db/", "/sqlite3/", "/psycopg2/", "/psycopg/")),
+)
+# C functions have no file ("~"); these are matched on their name instead,
+# e.g. "<method 'execute' of 'sqlite3.Cursor' objects>"
+BUILTIN_AREAS = (
+    ("orm", ("sqlite3", "psycopg")),
+)
+FALSE_VALUES = {"", "0", "false", "no", "off"}
+REPORT_FUNCTIONS = 40
+
+# cProfile can't profile two requests in one process at the same time
+_lock = threading.Lock()
+
+
+def requested_mode(request):
+    mode = request.GET.get("profile") or request.headers.get("X-Profile") or ""
+    return None if mode.strip().lower() in FALSE_VALUES else mode
+
+
+def area_for(filename, line=0, name=""):
+    """Reporting area of a function, from its pstats key (filename, line, name)."""
+    if filename == "~":
+        filename, areas = name, BUILTIN_AREAS
+    else:
+        filename, areas = filename.replace("\\", "/"), AREAS
+    for area, markers in areas:
+        if any(marker in filename for marker in markers):
+            return area
+    return "other"
+
+
+def area_totals(stats):
+    """
+    Own time (excluding callees) per area, in seconds. Other C functions
+    (numpy's, say) count towards the areas of the functions that called
+    them.
+    """
+    totals = {area: 0.0 for area, _ in AREAS}
+    totals["other"] = 0.0
+    for function, (_, _, own_time, _, callers) in stats.stats.items():
+        area = area_for(*function)
+        if area == "other" and function[0] == "~" and callers:
+            # cProfile records (calls, primitive calls, own time, cumulative) per caller
+            for caller, (_, _, caller_own_time, _) in callers.items():
+                totals[area_for(*caller)] += caller_own_time
+            continue
+        totals[area] += own_time
+    return totals
+
+
+def text_report(request, profiler, elapsed):
+    import pstats
+
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    out.write(f"{request.method} {request.get_full_path()}  {elapsed * 1000:.1f} ms wall time\n\n")
+    out.write("Own time by area:\n")
+    totals = area_totals(stats)
+    profiled = sum(totals.values()) or 1.0
+    for area, seconds in sorted(totals.items(), key=lambda item: -item[1]):
+        out.write(f"  {area:<12} {seconds * 1000:9.1f} ms  {seconds / profiled:6.1%}\n")
+    out.write(
+        "\n(Charts render in the chart worker processes; set RECIPE_CHART_WORKERS = 0\n"
+        " to include matplotlib in the profile.)\n\n"
+    )
+    stats.sort_stats("cumulative").print_stats(REPORT_FUNCTIONS)
+    stats.print_callees(REPORT_FUNCTIONS // 2)
+    return HttpResponse(out.getvalue(), content_type="text/plain; charset=utf-8")
+
+
+def prof_file(request, profiler):
+    """The profile in pstats' .prof format, as a download (and saved to PROFILE_DIR)."""
+    import pstats
+
+    match = request.resolver_match
+    name = f"{match.url_name if match else 'request'}-{int(time.time())}.prof"
+    # The same bytes pstats.Stats.dump_stats() writes
+    data = marshal.dumps(pstats.Stats(profiler).stats)
+    profile_dir = getattr(settings, "PROFILE_DIR", None)
+    if profile_dir:
+        Path(profile_dir).mkdir(parents=True, exist_ok=True)
+        (Path(profile_dir) / name).write_bytes(data)
+    response = HttpResponse(data, content_type="application/octet-stream")
+    response["Content-Disposition"] = f'attachment; filename="{name}"'
+    return response
+
+
+def load_pyinstrument():
+    try:
+        import pyinstrument
+    except ImportError:  # optional
+        return None
+    return pyinstrument
+
+
+class ProfilerMiddleware:
+    """Profile a request when a staff user asks for it (see module docstring)."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_PROFILING", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = requested_mode(request)
+        if not mode or not request.user.is_staff:
+            return self.get_response(request)
+        if not _lock.acquire(blocking=False):
+            response = self.get_response(request)
+            response["X-Profile"] = "busy"
+            return response
+        try:
+            pyinstrument = load_pyinstrument() if mode == "sample" else None
+            if pyinstrument is not None:
+                profiler = pyinstrument.Profiler()
+                profiler.start()
+                try:
+                    self.get_response(request)
+                finally:
+                    profiler.stop()
+                return HttpResponse(profiler.output_html())
+
+            import cProfile
+
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                self.get_response(request)
+            finally:
+                profiler.disable()
+            elapsed = time.perf_counter() - started
+        finally:
+            _lock.release()
+
+        if mode == "prof":
+            return prof_file(request, profiler)
+        return text_report(request, profiler, elapsed)
@@ -53,12 +53,19 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its total covers every other middleware
+    "recipe_app.timing.RequestTimingMiddleware",
+    "recipe_app.slow_queries.SlowQueryMiddleware",
+    # Before sessions, so cached anonymous pages skip them (recipe_app/page_cache.py)
+    "recipe_app.page_cache.PageCacheMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # Needs request.user; staff-only ?profile=1 (see recipe_app/profiling.py)
+    "recipe_app.profiling.ProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -67,7 +74,8 @@ ROOT_URLCONF = "recipe_app.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates, plus render timing for the Server-Timing header
+        "BACKEND": "recipe_app.timing.TimedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -161,3 +169,98 @@ LOGOUT_REDIRECT_URL = "/logout/"  # or wherever you want
 db_from_env = dj_database_url.config(conn_max_age=500, default=None)
 if db_from_env:
     DATABASES["default"].update(db_from_env)
+
+# Full-text search backend for the header search (see recipes/search.py).
+# Auto-detected from the database when unset; override with a dotted path, e.g.
+# RECIPE_SEARCH_BACKEND = "recipes.search.SimpleSearchBackend"
+
+# Number of recipe cards per keyset page (see recipes/pagination.py)
+RECIPES_PER_PAGE = 24
+
+# Memory bound (bytes) for the per-process advanced-search chart cache
+RECIPE_CHART_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Memory bound (bytes) for the per-process cache of rendered recipe cards
+RECIPE_CARD_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+# Advanced-search charts render in a pool of pre-warmed worker processes
+# (see recipes/chart_pool.py), started when each gunicorn worker boots
+# (gunicorn.conf.py). 0 workers renders in the request thread. Every web
+# worker has its own pool and each chart process takes about 65 MB, so
+# WEB_CONCURRENCY x RECIPE_CHART_WORKERS processes must fit in memory;
+# the default shares the CPUs between the web workers, up to 3 each.
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 1))
+RECIPE_CHART_WORKERS = int(os.environ.get(
+    "RECIPE_CHART_WORKERS", max(1, min(3, (os.cpu_count() or 1) // WEB_CONCURRENCY))
+))
+# Seconds to wait for the charts before showing a "chart unavailable" placeholder
+RECIPE_CHART_TIMEOUT = float(os.environ.get("RECIPE_CHART_TIMEOUT", 5))
+
+# Recipe picture thumbnails (see recipes/images.py); built by `manage.py build_thumbnails`
+RECIPE_THUMBNAIL_ROOT = BASE_DIR / "static" / "thumbnails"
+
+# Cache for the version counters, per-user favourite id sets and page cache.
+# Those need a cache shared by every gunicorn worker and management command,
+# and only pay off when it is fast: Redis, set with REDIS_URL (SHARED_CACHE). Without it each process gets a local in-memory
+# cache, the favourite sets and catalogue version fall back to plain database
+# queries and the page cache is off.
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+SHARED_CACHE = bool(REDIS_URL)
+
+# Queries slower than this (ms) are logged with their EXPLAIN plan; the log
+# keeps the newest SLOW_QUERY_LOG_SIZE entries (see recipe_app/slow_queries.py)
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 100))
+SLOW_QUERY_LOG_SIZE = 200
+
+# Staff can profile a request with ?profile=1 (text report), ?profile=prof
+# (.prof download, also saved to PROFILE_DIR if set) or ?profile=sample
+# (pyinstrument, if installed). False removes the middleware altogether.
+REQUEST_PROFILING = os.environ.get("REQUEST_PROFILING", "1") == "1"
+PROFILE_DIR = os.environ.get("PROFILE_DIR")
+
+# Prometheus metrics at /metrics (see recipe_app/metrics.py). Scrapers send
+# "Authorization: Bearer $METRICS_TOKEN". Under gunicorn, workers share values
+# through files in METRICS_DIR, a fresh temporary directory unless set (see
+# gunicorn.conf.py, which also empties it on start).
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+METRICS_DIR = os.environ.get("METRICS_DIR")
+
+# Anonymous visitors get the welcome, about and recipe pages from the cache;
+# pages are fresh this long and purged when their recipe changes. 0 disables.
+# Needs the shared cache above (off unless SHARED_CACHE).
+PAGE_CACHE_SECONDS = int(os.environ.get("PAGE_CACHE_SECONDS", 300))
+
+# Log to stderr (collected by the platform): warnings from everywhere, and
+# the per-request timing lines of recipe_app/timing.py at INFO. The test
+# runner turns the timing lines down (see recipe_app/test_runner.py).
+TIMING_LOG_LEVEL = os.environ.get("TIMING_LOG_LEVEL", "INFO")
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "plain": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "plain"},
+    },
+    "root": {"handlers": ["console"], "level": "WARNING"},
+    "loggers": {
+        "recipe_app.timing": {"level": TIMING_LOG_LEVEL},
+    },
+}
+
+TEST_RUNNER = "recipe_app.test_runner.TestRunner"
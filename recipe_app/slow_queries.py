@@ -0,0 +1,186 @@
+"""
+Slow-query log with EXPLAIN capture.
+
+SlowQueryMiddleware wraps every database connection during a request.
+Any query slower than SLOW_QUERY_THRESHOLD_MS is recorded with its SQL,
+parameters, the view and URL that issued it, and the database's plan
+for it (``EXPLAIN QUERY PLAN`` on SQLite, ``EXPLAIN`` on Postgres).
+
+Entries are collected during the request and inserted into the
+SlowQuery table once the response is ready, each as a new row, so
+concurrent workers never overwrite one another. Reading the log (the
+admin page at /admin/slow-queries/ or ``manage.py slow_queries``) keeps
+the newest SLOW_QUERY_LOG_SIZE rows and deletes the rest.
+"""
+import contextvars
+import logging
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from recipes.models import SlowQuery
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD_MS = 100
+DEFAULT_LOG_SIZE = 200
+
+# Statements the database can explain without side effects
+EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+EXPLAIN_SAVEPOINT = "slow_query_explain"
+
+_request = contextvars.ContextVar("slow_query_request", default=None)
+# Entries logged during the current request, written when it is done
+_pending = contextvars.ContextVar("slow_query_pending", default=None)
+
+
+def threshold_seconds():
+    return getattr(settings, "SLOW_QUERY_THRESHOLD_MS", DEFAULT_THRESHOLD_MS) / 1000
+
+
+def log_size():
+    return getattr(settings, "SLOW_QUERY_LOG_SIZE", DEFAULT_LOG_SIZE)
+
+
+def plain_params(params):
+    """Parameters as JSON-friendly values (anything unusual becomes its repr)."""
+    def plain(value):
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        return repr(value)
+
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: plain(value) for key, value in params.items()}
+    return [plain(value) for value in params]
+
+
+def explain(connection, sql, params):
+    """
+    The database's query plan for ``sql`` as a list of lines. Runs on a
+    raw backend cursor, so it doesn't go through the execute wrappers or
+    show up in the query log.
+    """
+    prefix = connection.ops.explain_query_prefix()
+    cursor = connection.create_cursor()
+    # A savepoint, so a failing EXPLAIN can't break the caller's transaction
+    savepoint = connection.in_atomic_block
+    try:
+        if savepoint:
+            cursor.execute(f"SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        try:
+            cursor.execute(f"{prefix} {sql}", params)
+            rows = cursor.fetchall()
+        except Exception:
+            if savepoint:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}")
+            raise
+        finally:
+            if savepoint:
+                cursor.execute(f"RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}")
+    finally:
+        cursor.close()
+    if connection.vendor == "sqlite":
+        # (id, parent, notused, detail)
+        return [row[-1] for row in rows]
+    return [" ".join(str(column) for column in row) for row in rows]
+
+
+def record(entries):
+    """Append ``entries`` to the log."""
+    SlowQuery.objects.bulk_create(SlowQuery(entry=entry) for entry in entries)
+
+
+def entries(limit=None):
+    """
+    Logged slow queries, newest first. Rows beyond the newest
+    SLOW_QUERY_LOG_SIZE are deleted here rather than on every write.
+    """
+    rows = list(SlowQuery.objects.order_by("-id")[: log_size()])
+    if len(rows) == log_size():
+        SlowQuery.objects.filter(id__lt=rows[-1].id).delete()
+    logged = [{**row.entry, "number": row.id} for row in rows]
+    return logged[:limit] if limit else logged
+
+
+def clear():
+    SlowQuery.objects.all().delete()
+
+
+class SlowQueryWrapper:
+    """Database execute wrapper that records queries over the threshold."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - started
+        if duration >= threshold_seconds():
+            self.log(sql, params, many, duration)
+        return result
+
+    def log(self, sql, params, many, duration):
+        request = _request.get()
+        match = getattr(request, "resolver_match", None)
+        entry = {
+            "time": timezone.now().isoformat(),
+            "duration_ms": round(duration * 1000, 2),
+            "database": self.connection.alias,
+            "sql": sql,
+            "params": None if many else plain_params(params),
+            "view": match.view_name if match else None,
+            "method": request.method if request else None,
+            "url": request.get_full_path() if request else None,
+            "plan": None,
+        }
+        if (
+            not many
+            and self.connection.features.supports_explaining_query_execution
+            and EXPLAINABLE.match(sql)
+        ):
+            try:
+                entry["plan"] = explain(self.connection, sql, params)
+            except Exception as error:
+                entry["plan"] = [f"EXPLAIN failed: {error}"]
+        pending = _pending.get()
+        if pending is not None:
+            pending.append(entry)
+        logger.warning(
+            "Slow query (%.1f ms) in %s: %s", entry["duration_ms"], entry["view"], sql[:200]
+        )
+
+
+class SlowQueryMiddleware:
+    """Record slow queries (with their plans) issued while handling requests."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _request.set(request)
+        pending_token = _pending.set([])
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(SlowQueryWrapper(connection)))
+                response = self.get_response(request)
+            # Written after the wrappers are removed, so the inserts aren't logged
+            pending = _pending.get()
+            if pending:
+                try:
+                    record(pending)
+                except Exception:
+                    # Never let the diagnostics break the request
+                    logger.exception("Could not record slow queries")
+            return response
+        finally:
+            _pending.reset(pending_token)
+            _request.reset(token)
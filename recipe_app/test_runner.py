@@ -0,0 +1,13 @@
+"""
+Test runner for ``manage.py test``: the suite sends hundreds of requests,
+each of which would otherwise print a timing line (see LOGGING).
+"""
+import logging
+
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        logging.getLogger("recipe_app.timing").setLevel(logging.WARNING)
@@ -0,0 +1,160 @@
+"""
+Per-request performance instrumentation.
+
+RequestTimingMiddleware measures, for every request:
+
+- total time in the view stack,
+- number of database queries and time spent in them
+  (``connection.execute_wrapper`` on every configured database),
+- template rendering time (via the TimedDjangoTemplates backend),
+- any named spans opened by the code handling the request::
+
+      from recipe_app import timing
+
+      with timing.span("charts"):
+          ...
+
+The results are sent back in a ``Server-Timing`` header (visible in the
+browser dev tools) and written as one logfmt line to the
+``recipe_app.timing`` logger; per-view latency and query counts also go
+to the Prometheus metrics. Outside a request, spans are no-ops.
+"""
+import contextvars
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+from . import metrics
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("request_timer", default=None)
+
+
+class RequestTimer:
+    """Timings collected while handling one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        # Span name -> total seconds, in the order spans were first opened
+        self.spans = {}
+        self._open = set()
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper counting queries and their time."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def server_timing(self, total):
+        entries = [
+            f"total;dur={total * 1000:.1f}",
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+        ]
+        entries += [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.spans.items()]
+        return ", ".join(entries)
+
+
+@contextmanager
+def span(name):
+    """
+    Time the enclosed block as ``name`` for the current request. Nested
+    spans with the same name (e.g. templates rendering templates) are
+    only counted once.
+    """
+    timer = _current.get()
+    if timer is None or name in timer._open:
+        yield
+        return
+    timer._open.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer._open.discard(name)
+        timer.add(name, time.perf_counter() - started)
+
+
+def record(name, seconds):
+    """Add a duration measured elsewhere (e.g. in a worker process) as a span."""
+    timer = _current.get()
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+class RequestTimingMiddleware:
+    """Emit Server-Timing headers and a timing log line for every request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = RequestTimer()
+        token = _current.set(timer)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        total = time.perf_counter() - timer.started
+        response["Server-Timing"] = timer.server_timing(total)
+        match = request.resolver_match
+        metrics.observe_request(
+            match.view_name if match else "unmatched",
+            response.status_code,
+            total,
+            timer.db_queries,
+            timer.db_time,
+        )
+        fields = {
+            "total_ms": total * 1000,
+            "db_queries": timer.db_queries,
+            "db_ms": timer.db_time * 1000,
+            **{f"{name}_ms": seconds * 1000 for name, seconds in timer.spans.items()},
+        }
+        logger.info(
+            "method=%s path=%s status=%s %s",
+            request.method,
+            request.path,
+            response.status_code,
+            " ".join(
+                f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}"
+                for key, value in fields.items()
+            ),
+            extra={"timing": fields},
+        )
+        return response
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with span("template"):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing each render as the "template" span."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
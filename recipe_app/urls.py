@@ -20,11 +20,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from .views import login_view, logout_view, welcome_view, about_view
+from .views import login_view, logout_view, welcome_view, about_view, slow_queries_view, metrics_view
 from recipes import views as recipe_views
 from users.views import signup_view
 
 urlpatterns = [
+    path("admin/slow-queries/", slow_queries_view, name="slow_queries"),
     path("admin/", admin.site.urls),
     path("", welcome_view, name="welcome"),
     path("recipes/", include("recipes.urls")),
@@ -34,6 +35,7 @@ urlpatterns = [
     path("signup/", signup_view, name="signup"),
     path("accounts/", include("django.contrib.auth.urls")),
     path("about/", about_view, name="about"),
+    path("metrics", metrics_view, name="metrics"),
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,8 +1,16 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.forms import AuthenticationForm
-from django.contrib import messages
+from django.contrib import admin, messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
 
+from . import metrics, slow_queries
+from .page_cache import cache_anonymous_page
+
+@cache_anonymous_page()
 def welcome_view(request):
     return render(request, "recipes/welcome.html")
 
@@ -29,6 +37,35 @@ def logout_view(request):
     logout(request)
     return render(request, "auth/success.html")
 
+@cache_anonymous_page()
 def about_view(request):
     return render(request, "about.html")
 
+
+@staff_member_required
+def slow_queries_view(request):
+    """Admin-only page listing the slow-query log (POST clears it)."""
+    if request.method == "POST":
+        slow_queries.clear()
+        messages.success(request, "Slow-query log cleared.")
+        return redirect("slow_queries")
+    context = {
+        **admin.site.each_context(request),
+        "title": "Slow queries",
+        "entries": slow_queries.entries(),
+        "threshold_ms": slow_queries.threshold_seconds() * 1000,
+    }
+    return render(request, "admin/slow_queries.html", context)
+
+
+def metrics_view(request):
+    """
+    Prometheus metrics for every worker. Scrapers authenticate with
+    "Authorization: Bearer <METRICS_TOKEN>"; staff can also look in a browser.
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    authorization = request.headers.get("Authorization", "")
+    authorized = bool(token) and constant_time_compare(authorization, f"Bearer {token}")
+    if not (authorized or request.user.is_staff):
+        return HttpResponse("Forbidden", status=403, content_type="text/plain")
+    return HttpResponse(metrics.REGISTRY.exposition(), content_type=metrics.CONTENT_TYPE)
@@ -1,6 +1,8 @@
 from django.contrib import admin
-from .models import Recipe
+from .models import Recipe, Ingredient, RecipeStats
 
 # Register your models here.
 
 admin.site.register(Recipe)
+admin.site.register(Ingredient)
+admin.site.register(RecipeStats)
@@ -0,0 +1,69 @@
+"""
+Catalogue analytics computed in the database.
+
+Counts per meal type, per difficulty and per cooking-time band are
+GROUP BY queries (with CASE bucketing for the bands), so the charts'
+data costs a few hundred bytes instead of every matching row.
+"""
+from django.db.models import Case, CharField, Count, Value, When
+
+# (label, min minutes, max minutes inclusive or None for open-ended)
+COOKING_TIME_BANDS = [
+    ("no-cook", 0, 0),
+    ("under-10", 1, 9),
+    ("10-29", 10, 29),
+    ("30-59", 30, 59),
+    ("60+", 60, None),
+]
+
+
+def cooking_time_band(minutes):
+    """Python twin of cooking_time_band_expression() for a single value."""
+    for label, low, high in COOKING_TIME_BANDS:
+        if minutes >= low and (high is None or minutes <= high):
+            return label
+    return COOKING_TIME_BANDS[0][0]
+
+
+def cooking_time_band_expression():
+    """SQL CASE expression mapping cooking_time to its band label."""
+    whens = [
+        When(cooking_time__lte=high, then=Value(label))
+        for label, _, high in COOKING_TIME_BANDS
+        if high is not None
+    ]
+    return Case(*whens, default=Value(COOKING_TIME_BANDS[-1][0]), output_field=CharField())
+
+
+def grouped_counts(queryset, field):
+    """{value: count} for ``field``, most common first."""
+    rows = (
+        queryset.order_by()
+        .values(field)
+        .annotate(total=Count("id"))
+        .order_by("-total", field)
+    )
+    return {row[field]: row["total"] for row in rows}
+
+
+def recipe_analytics(queryset):
+    """
+    Meal-type counts, difficulty counts and cooking-time histogram for
+    ``queryset``, aggregated in the database.
+    """
+    meal_types = grouped_counts(queryset, "meal_type")
+    difficulties = grouped_counts(queryset, "difficulty")
+    band_counts = grouped_counts(
+        queryset.annotate(cooking_time_band=cooking_time_band_expression()),
+        "cooking_time_band",
+    )
+    return {
+        "count": sum(meal_types.values()),
+        "meal_types": meal_types,
+        "difficulties": difficulties,
+        # Histogram keeps band order and includes empty bands
+        "cooking_time": [
+            {"band": label, "count": band_counts.get(label, 0)}
+            for label, _, _ in COOKING_TIME_BANDS
+        ],
+    }
@@ -0,0 +1,246 @@
+"""
+View-level benchmarks on a synthetic catalogue (see ``manage.py bench``).
+
+The catalogue is generated deterministically from a seed, so two runs
+with the same size and seed (e.g. on two branches) see the same data.
+Recipes go in through the bulk importer, which keeps the ingredient
+index, search index and statistics rollup consistent with the catalogue.
+"""
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.models import Favourite
+
+from .importer import bulk_insert_recipes
+from .models import Recipe
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+# Extra requests per view traced for memory, after (not during) the timed ones
+MEMORY_REQUESTS = 3
+
+ADJECTIVES = (
+    "Classic", "Spicy", "Smoky", "Creamy", "Crispy", "Rustic", "Zesty", "Golden",
+    "Hearty", "Quick", "Roasted", "Grilled", "Sticky", "Fresh", "Slow-cooked", "Herby",
+)
+DISHES = (
+    "Pasta", "Curry", "Stew", "Salad", "Soup", "Pie", "Tacos", "Risotto", "Omelette",
+    "Pancakes", "Stir-fry", "Burger", "Noodles", "Casserole", "Smoothie", "Tart",
+)
+INGREDIENTS = (
+    "salt", "pepper", "olive oil", "butter", "garlic", "onion", "tomato", "carrot",
+    "celery", "potato", "rice", "pasta", "flour", "sugar", "eggs", "milk", "cream",
+    "cheese", "parmesan", "chicken", "beef", "pork", "lamb", "salmon", "tuna", "prawns",
+    "tofu", "chickpeas", "lentils", "beans", "spinach", "kale", "lettuce", "cucumber",
+    "pepper flakes", "chilli", "ginger", "lemon", "lime", "orange", "apple", "banana",
+    "berries", "honey", "yogurt", "basil", "parsley", "coriander", "thyme", "rosemary",
+    "cumin", "paprika", "turmeric", "coconut milk", "soy sauce", "vinegar", "mustard",
+    "mushrooms", "courgette", "aubergine", "peas", "sweetcorn", "noodles", "bread",
+)
+MEAL_TYPES = [value for value, _ in Recipe.MEAL_TYPE_CHOICES]
+COOKING_TIMES = (0, 5, 8, 10, 15, 20, 25, 30, 45, 60, 90, 120)
+
+BATCH_SIZE = 5000
+DEFAULT_USERS = 50
+MAX_FAVOURITES_PER_USER = 50
+USERNAME_PREFIX = "bench-user-"
+
+
+def parse_size(value):
+    """'1k', '100k', '1m' or a plain number of recipes."""
+    value = str(value).lower()
+    return SIZES[value] if value in SIZES else int(value)
+
+
+def synthetic_recipes(count, rng):
+    """Yield ``count`` unsaved recipes."""
+    for number in range(count):
+        ingredients = rng.sample(INGREDIENTS, rng.randint(1, 9))
+        yield Recipe(
+            name=f"{rng.choice(ADJECTIVES)} {rng.choice(DISHES)} {number}",
+            description="Synthetic benchmark recipe",
+            instructions="Mix. Cook. Serve.",
+            ingredients=", ".join(ingredients),
+            prep_time=rng.randint(0, 60),
+            cooking_time=rng.choice(COOKING_TIMES),
+            meal_type=rng.choice(MEAL_TYPES),
+        )
+
+
+def generate_catalogue(size, users, seed, log=lambda message: None):
+    """Create ``size`` recipes, ``users`` users and their favourites."""
+    rng = random.Random(seed)
+    batch = []
+    created = 0
+    for recipe in synthetic_recipes(size, rng):
+        batch.append(recipe)
+        if len(batch) >= BATCH_SIZE:
+            created += len(bulk_insert_recipes(batch))
+            batch = []
+            log(f"  {created} recipes")
+    created += len(bulk_insert_recipes(batch))
+
+    password = make_password("bench")
+    User.objects.bulk_create(
+        [User(username=f"{USERNAME_PREFIX}{number}", password=password) for number in range(users)]
+    )
+    accounts = list(User.objects.filter(username__startswith=USERNAME_PREFIX).order_by("id"))
+    first_id, last_id = recipe_id_range()
+    favourites = [
+        Favourite(user=user, recipe_id=recipe_id)
+        for user in accounts
+        for recipe_id in {
+            rng.randint(first_id, last_id)
+            for _ in range(rng.randint(0, MAX_FAVOURITES_PER_USER))
+        }
+    ]
+    Favourite.objects.bulk_create(favourites, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    cache.clear()
+    return created, len(accounts), len(favourites)
+
+
+def recipe_id_range():
+    ids = Recipe.objects.order_by("id").values_list("id", flat=True)
+    return ids.first(), ids.last()
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, round(percent / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far (its whole lifetime)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_revision():
+    """Short hash of the checked-out commit, to tell reports apart (None outside git)."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Scenario:
+    """One view driven through the test client; ``request`` returns a response."""
+
+    def __init__(self, name, request):
+        self.name = name
+        self.request = request
+
+    def send(self):
+        response = self.request()
+        # Consume streamed bodies so their time and memory are included
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+    def peak_allocated_mb(self, requests=MEMORY_REQUESTS):
+        """
+        Most memory one request allocated on top of what was already in
+        use (tracemalloc), in MB. Measured on separate requests, since
+        tracing slows everything down. Charts drawn in the chart worker
+        processes are not included.
+        """
+        peak = 0
+        tracemalloc.start()
+        try:
+            for _ in range(requests):
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                self.send()
+                peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+        finally:
+            tracemalloc.stop()
+        return round(peak / (1024 * 1024), 2)
+
+    def run(self, iterations, warmup):
+        latencies, queries, errors = [], [], 0
+        for iteration in range(warmup + iterations):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = self.send()
+                elapsed = time.perf_counter() - started
+            if iteration < warmup:
+                continue
+            latencies.append(elapsed * 1000)
+            queries.append(len(captured))
+            if response.status_code >= 400:
+                errors += 1
+        latencies.sort()
+        return {
+            "requests": iterations,
+            "errors": errors,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "mean_ms": round(statistics.fmean(latencies), 2),
+            "queries": {
+                "min": min(queries),
+                "max": max(queries),
+                "mean": round(statistics.fmean(queries), 2),
+            },
+            "peak_alloc_mb": self.peak_allocated_mb(),
+        }
+
+
+def scenarios(seed):
+    """The benchmarked views, each with its own deterministic request stream."""
+    rng = random.Random(seed)
+    first_id, last_id = recipe_id_range()
+    user = User.objects.filter(username__startswith=USERNAME_PREFIX).order_by("id").first()
+
+    anonymous = Client()
+    logged_in = Client()
+    logged_in.force_login(user)
+
+    def recipe_list():
+        return logged_in.get(reverse("recipes:recipe_list"))
+
+    def recipe_detail():
+        return anonymous.get(reverse("recipes:recipe_detail", args=[rng.randint(first_id, last_id)]))
+
+    def header_search():
+        return logged_in.get(reverse("recipes:search_recipes"), {"q": rng.choice(INGREDIENTS)})
+
+    def advanced_search():
+        filters = rng.choice((
+            {"name": rng.choice(DISHES)},
+            {"ingredient": rng.choice(INGREDIENTS)},
+            {"meal_type": rng.choice(MEAL_TYPES), "max_cooking_time": rng.choice(COOKING_TIMES)},
+            {"difficulty": rng.choice(("easy", "medium", "hard")), "name": rng.choice(ADJECTIVES)},
+        ))
+        return anonymous.get(reverse("recipes:advanced_search"), filters)
+
+    def favourite_toggle():
+        return logged_in.post(reverse("users:toggle_favourite", args=[rng.randint(first_id, last_id)]))
+
+    return [
+        Scenario("recipe_list", recipe_list),
+        Scenario("recipe_detail", recipe_detail),
+        Scenario("header_search", header_search),
+        Scenario("advanced_search", advanced_search),
+        Scenario("favourite_toggle", favourite_toggle),
+    ]
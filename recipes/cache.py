@@ -0,0 +1,203 @@
+"""
+Caching helpers for the recipes app.
+
+- Versions kept in the Django cache when it is shared by every process
+  (SHARED_CACHE, see CACHES in settings). The catalogue version is
+  bumped on every Recipe save/delete; callers fold it into their cache
+  keys so stale entries are never served. Cached pages of one recipe
+  have their own version, so a save purges only that recipe's pages.
+  Without a shared cache the catalogue version is read from the
+  database instead, and the page cache is off.
+- A small in-process LRU cache bounded by total size in bytes, used for
+  the advanced-search chart images and the rendered recipe cards.
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+
+from recipe_app import metrics
+
+from . import stats
+from .models import Recipe
+
+CATALOGUE_VERSION_KEY = "recipes:catalogue_version"
+# Bumped by bulk changes that bypass the signals, to purge every recipe page
+RECIPE_PAGES_VERSION_KEY = "recipes:pages_version"
+
+# Default memory bound for the chart cache (bytes of base64 PNG data)
+DEFAULT_CHART_CACHE_MAX_BYTES = 32 * 1024 * 1024
+# Default memory bound for the rendered recipe card cache (bytes of HTML)
+DEFAULT_CARD_CACHE_MAX_BYTES = 8 * 1024 * 1024
+# Seconds before charts that failed or timed out are tried again
+CHART_RETRY_SECONDS = 60
+
+
+def shared_cache():
+    """Whether the Django cache is shared by every process (see SHARED_CACHE)."""
+    return getattr(settings, "SHARED_CACHE", False)
+
+
+def new_version():
+    """
+    A version no other bump will produce: the clock (so a version evicted
+    from the cache is never reused) plus random bits (so two processes
+    bumping at once never agree).
+    """
+    return (time.time_ns() << 16) | secrets.randbits(16)
+
+
+def get_version(key):
+    """Read the version stored in the Django cache under ``key``."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, new_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """
+    Replace the version under ``key`` with a new one and return it. A
+    plain set rather than ``cache.incr``, which is a non-atomic read and
+    write on some backends (e.g. the database cache), so two concurrent
+    bumps could otherwise both produce the same version.
+    """
+    version = new_version()
+    cache.set(key, version, timeout=None)
+    return version
+
+
+def get_catalogue_version():
+    """
+    Current catalogue version (changes whenever any recipe changes).
+    Without a shared cache it comes from the database: the latest
+    ``updated_at`` (set by every save, import and recompute, on an index)
+    and the recipe count (from the statistics rollup), which deletes change.
+    """
+    if shared_cache():
+        return get_version(CATALOGUE_VERSION_KEY)
+    latest = Recipe.objects.aggregate(latest=Max("updated_at"))["latest"]
+    return f"{stats.recipe_count()}-{latest.timestamp() if latest else 0:.6f}"
+
+
+def bump_catalogue_version():
+    return bump_version(CATALOGUE_VERSION_KEY)
+
+
+def recipe_version_key(pk):
+    return f"recipes:recipe_version:{pk}"
+
+
+def get_recipe_page_version(pk):
+    """Version of the cached pages showing recipe ``pk``."""
+    versions = cache.get_many([RECIPE_PAGES_VERSION_KEY, recipe_version_key(pk)])
+    everything = versions.get(RECIPE_PAGES_VERSION_KEY) or get_version(RECIPE_PAGES_VERSION_KEY)
+    recipe = versions.get(recipe_version_key(pk)) or get_version(recipe_version_key(pk))
+    return f"{everything}-{recipe}"
+
+
+def purge_recipe_pages(pk):
+    bump_version(recipe_version_key(pk))
+
+
+def purge_all_recipe_pages():
+    bump_version(RECIPE_PAGES_VERSION_KEY)
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by the total size of
+    its values (as reported by ``sizeof``) rather than by entry count.
+    """
+
+    def __init__(self, max_bytes, sizeof=len, name=None):
+        self.max_bytes = max_bytes
+        # Hits and misses are counted in the metrics under this name
+        self.name = name
+        self.sizeof = sizeof
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if self.name:
+            metrics.cache_lookup(self.name, entry is not None)
+        return default if entry is None else entry[1]
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[0]
+            self._entries[key] = (size, value)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (evicted_size, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+# (bar, pie, line) base64 strings, None for missing charts, and the
+# time.monotonic() after which the missing ones may be rendered again
+CachedCharts = namedtuple("CachedCharts", ["charts", "retry_at"])
+
+
+def charts_size(entry):
+    """Size in bytes of a CachedCharts entry's base64 chart strings."""
+    return sum(len(chart) for chart in entry.charts if chart)
+
+
+chart_cache = LRUCache(
+    getattr(settings, "RECIPE_CHART_CACHE_MAX_BYTES", DEFAULT_CHART_CACHE_MAX_BYTES),
+    sizeof=charts_size,
+    name="charts",
+)
+
+
+def chart_cache_key(filters):
+    """
+    Normalize AdvancedSearchForm.cleaned_data into a hashable key:
+    empty filters are dropped and text filters are case-folded, so
+    equivalent searches share an entry.
+    """
+    normalized = []
+    for field, value in sorted((filters or {}).items()):
+        if value is None or value == "" or value == "all":
+            continue
+        if isinstance(value, str):
+            value = value.strip().lower()
+        normalized.append((field, value))
+    return (get_catalogue_version(), tuple(normalized))
+
+
+def card_size(parts):
+    """Size in bytes of a cached card (a tuple of HTML strings)."""
+    return sum(len(part) for part in parts)
+
+
+# Keys include the recipe's updated_at, so entries never go stale and need
+# no cross-process invalidation; the LRU bound drops the old ones.
+card_cache = LRUCache(
+    getattr(settings, "RECIPE_CARD_CACHE_MAX_BYTES", DEFAULT_CARD_CACHE_MAX_BYTES),
+    sizeof=card_size,
+    name="cards",
+)
@@ -0,0 +1,184 @@
+"""
+Render the advanced-search charts concurrently in a persistent pool of
+pre-warmed worker processes.
+
+matplotlib's pyplot state is global and not thread-safe, so each chart
+is drawn in its own process. Workers import matplotlib and build the
+font cache once, when the pool starts; under gunicorn that is at worker
+boot (``post_worker_init`` in gunicorn.conf.py), so no request pays for
+it. Each web worker has its own pool of RECIPE_CHART_WORKERS processes
+of roughly 65 MB each.
+
+The charts get aggregated data (counts, and at most LINE_CHART_MAX_POINTS
+points for the line chart), so drawing time doesn't grow with the number
+of matching recipes. A chart that is not ready within RECIPE_CHART_TIMEOUT
+seconds comes back as None and the page shows a "chart unavailable"
+placeholder. The pool is then replaced, since a running render can't be
+cancelled and would hold its process for the requests queued behind it.
+
+Set RECIPE_CHART_WORKERS = 0 to render in the request thread instead.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from recipe_app import metrics, timing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 3
+DEFAULT_TIMEOUT = 5.0
+CHART_KINDS = ("bar", "pie", "line")
+LINE_CHART_MAX_POINTS = 60
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _warm_up():
+    from .charts import warm_up
+
+    warm_up()
+
+
+def _ready():
+    """No-op task; submitting one per worker makes the pool start them all."""
+
+
+def _render_chart(kind, data):
+    """Returns (chart, seconds spent drawing it) so the caller can report the time."""
+    # Imported here so only the chart workers (or inline rendering) load matplotlib
+    from .charts import render_chart
+
+    started = time.perf_counter()
+    chart = render_chart(kind, data)
+    return chart, time.perf_counter() - started
+
+
+def _collect(kind, result):
+    chart, seconds = result
+    timing.record(f"chart_{kind}", seconds)
+    metrics.CHART_RENDER_SECONDS.observe(seconds, chart=kind)
+    return chart
+
+
+def get_executor():
+    """Return the shared chart pool, starting it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, "RECIPE_CHART_WORKERS", DEFAULT_WORKERS),
+                # "spawn" keeps Django's DB connections and threads out of the workers
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up,
+            )
+        return _executor
+
+
+def start_pool():
+    """Start the pool and all its worker processes now (called at web worker boot)."""
+    workers = getattr(settings, "RECIPE_CHART_WORKERS", DEFAULT_WORKERS)
+    if workers:
+        executor = get_executor()
+        for _ in range(workers):
+            executor.submit(_ready)
+
+
+def shutdown_executor(executor=None):
+    """
+    Shut down ``executor`` (default: the current pool). The next render
+    starts a new pool, unless another request has already replaced it.
+    """
+    global _executor
+    with _executor_lock:
+        executor = executor or _executor
+        if executor is None:
+            return
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def retire_executor(executor):
+    """
+    Replace a pool whose worker is stuck on a render that timed out.
+    Renders still running in it (for other requests) come back as None.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    # The executor has no public way to stop a running task
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+    start_pool()
+
+
+def sample_points(points, limit):
+    """At most ``limit`` evenly spaced points, always keeping the first and last."""
+    if len(points) <= limit:
+        return points
+    step = (len(points) - 1) / (limit - 1)
+    return [points[round(index * step)] for index in range(limit)]
+
+
+def chart_payloads(rows):
+    """Aggregate recipe rows (dicts) into the small, plain data each chart needs."""
+    times = sorted(((row["name"], row["cooking_time"]) for row in rows), key=lambda point: point[1])
+    return {
+        "bar": Counter(row["meal_type"] for row in rows).most_common(),
+        "pie": Counter(row["difficulty"] for row in rows).most_common(),
+        "line": sample_points(times, LINE_CHART_MAX_POINTS),
+    }
+
+
+def render_charts(rows, kinds=CHART_KINDS):
+    """
+    Render the bar, pie and line charts for ``rows`` (only those in
+    ``kinds``). Returns (bar, pie, line) base64 strings; a chart that was
+    not requested, failed or timed out is None.
+    """
+    payloads = chart_payloads(rows)
+
+    if not getattr(settings, "RECIPE_CHART_WORKERS", DEFAULT_WORKERS):
+        return tuple(
+            _collect(kind, _render_chart(kind, payloads[kind])) if kind in kinds else None
+            for kind in CHART_KINDS
+        )
+
+    timeout = getattr(settings, "RECIPE_CHART_TIMEOUT", DEFAULT_TIMEOUT)
+    executor = get_executor()
+    try:
+        futures = {kind: executor.submit(_render_chart, kind, payloads[kind]) for kind in kinds}
+    except BrokenProcessPool:
+        shutdown_executor(executor)
+        logger.exception("Chart pool is broken; charts skipped")
+        return (None, None, None)
+
+    # Charts render concurrently, so every chart shares the same deadline
+    deadline = time.monotonic() + timeout
+    results = dict.fromkeys(CHART_KINDS)
+    timed_out = False
+    for kind, future in futures.items():
+        try:
+            result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            results[kind] = _collect(kind, result)
+        except TimeoutError:
+            timed_out = True
+            logger.warning("Chart %r timed out after %.1fs", kind, timeout)
+        except BrokenProcessPool:
+            shutdown_executor(executor)
+            logger.exception("Chart pool broke while rendering %r", kind)
+        except Exception:
+            logger.exception("Chart %r failed to render", kind)
+    if timed_out:
+        retire_executor(executor)
+    return tuple(results[kind] for kind in CHART_KINDS)
@@ -0,0 +1,90 @@
+"""
+Matplotlib chart rendering for the advanced search page.
+
+These functions run inside the chart worker processes (see
+recipes/chart_pool.py), so they take plain, already aggregated Python
+data rather than querysets or DataFrames and return base64-encoded PNG
+strings.
+"""
+import base64
+from io import BytesIO
+
+# Non-GUI backend for server environments
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+
+def figure_to_base64(fig):
+    """Render a matplotlib figure to a base64 PNG string and close it."""
+    buf = BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight")
+    encoded = base64.b64encode(buf.getvalue()).decode("utf-8")
+    buf.close()
+    plt.close(fig)
+    return encoded
+
+
+def meal_type_bar(counts):
+    """Bar chart: recipes per meal type, from (meal type, count) pairs."""
+    fig, ax = plt.subplots()
+    ax.bar([str(label) for label, _ in counts], [count for _, count in counts], color="#2c6f2c")
+    ax.set_title("Recipes per Meal Type")
+    ax.set_xlabel("Meal Type")
+    ax.set_ylabel("Number of Recipes")
+    fig.tight_layout()
+    return figure_to_base64(fig)
+
+
+def difficulty_pie(counts):
+    """Pie chart: difficulty distribution, from (difficulty, count) pairs."""
+    fig, ax = plt.subplots()
+    ax.pie(
+        [count for _, count in counts],
+        labels=[str(label) for label, _ in counts],
+        autopct="%1.1f%%",
+        startangle=140,
+    )
+    ax.set_title("Recipe Difficulty Distribution")
+    fig.tight_layout()
+    return figure_to_base64(fig)
+
+
+def cooking_time_line(points):
+    """Line chart: cooking time per recipe, from (name, minutes) pairs sorted by time."""
+    fig, ax = plt.subplots()
+    ax.plot(
+        [str(name) for name, _ in points],
+        [time for _, time in points],
+        marker="o",
+        linestyle="-",
+        color="#CBA135",
+    )
+    ax.set_title("Cooking Time per Recipe")
+    ax.set_xlabel("Recipe")
+    ax.set_ylabel("Cooking Time (min)")
+    ax.tick_params(axis="x", rotation=45, labelsize=8)
+    fig.tight_layout()
+    return figure_to_base64(fig)
+
+
+CHARTS = {
+    "bar": meal_type_bar,
+    "pie": difficulty_pie,
+    "line": cooking_time_line,
+}
+
+
+def render_chart(kind, data):
+    return CHARTS[kind](data)
+
+
+def warm_up():
+    """
+    Process-pool initializer: import matplotlib, load the font cache and
+    draw one throwaway figure so the first real chart renders at full speed.
+    """
+    from matplotlib import font_manager
+
+    font_manager.fontManager.findfont("DejaVu Sans")
+    meal_type_bar([("dinner", 1)])
@@ -0,0 +1,72 @@
+"""
+Conditional GET (ETag / Last-Modified) for the recipe pages.
+
+Validators are cheap (one recipe's ``updated_at``; for the list, the
+catalogue and favourites versions, from the shared cache or else from
+indexed queries) so an unchanged page is answered with 304 Not Modified
+before the view queries anything else or renders a template. Every
+worker agrees on them. Pages also show who is logged in (and, on
+listings, which recipes are their favourites), so both are folded into
+the validators.
+"""
+from django.contrib.messages import get_messages
+from django.views.decorators.http import condition
+
+from users.cache import get_favourites_version
+
+from .cache import get_catalogue_version
+from .models import Recipe
+
+
+def has_pending_messages(request):
+    """A 304 would swallow queued flash messages, so skip validation then."""
+    return len(get_messages(request)) > 0
+
+
+def user_tag(request):
+    return f"u{request.user.pk}" if request.user.is_authenticated else "anon"
+
+
+def recipe_updated_at(request, pk):
+    """``updated_at`` of the requested recipe (None if missing), fetched once per request."""
+    cached = getattr(request, "_recipe_updated_at", None)
+    if cached is None or cached[0] != pk:
+        updated_at = Recipe.objects.filter(pk=pk).values_list("updated_at", flat=True).first()
+        cached = request._recipe_updated_at = (pk, updated_at)
+    return cached[1]
+
+
+def recipe_detail_etag(request, pk, **kwargs):
+    if has_pending_messages(request):
+        return None
+    updated_at = recipe_updated_at(request, pk)
+    if updated_at is None:
+        # Let the view raise its 404
+        return None
+    return f"recipe-{pk}-{updated_at.timestamp():.6f}-{user_tag(request)}"
+
+
+def recipe_detail_last_modified(request, pk, **kwargs):
+    if has_pending_messages(request):
+        return None
+    return recipe_updated_at(request, pk)
+
+
+def recipe_list_etag(request, *args, **kwargs):
+    """
+    Keyed on the catalogue and favourites versions, which every save,
+    delete and favourite change moves. No Last-Modified: a timestamp
+    alone can't tell that a recipe was deleted.
+    """
+    if has_pending_messages(request):
+        return None
+    return (
+        f"recipes-{get_catalogue_version()}-{user_tag(request)}"
+        f"-{get_favourites_version(request.user.pk)}"
+    )
+
+
+recipe_detail_condition = condition(
+    etag_func=recipe_detail_etag, last_modified_func=recipe_detail_last_modified
+)
+recipe_list_condition = condition(etag_func=recipe_list_etag)
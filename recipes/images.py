@@ -0,0 +1,158 @@
+"""
+Thumbnail pipeline for recipe pictures.
+
+Recipe.pic is a path to a static file. For each picture we generate
+card-size and detail-size thumbnails in WebP and JPEG, named after a
+hash of the source image so they can be cached forever, and record them
+in a JSON manifest. Templates use the manifest (via the recipe_picture
+tag) to emit a <picture> with srcset, falling back to the original file
+when no thumbnails exist yet.
+
+Run ``manage.py build_thumbnails`` before collectstatic to backfill.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Rendition name -> target widths (px); the largest doubles as the 2x version
+RENDITIONS = {
+    "card": (320, 640),
+    "detail": (800, 1600),
+}
+FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 6},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+
+# Thumbnails live in a sub-folder of a STATICFILES_DIRS entry so they are served
+# (and collected) like any other static file.
+THUMBNAIL_PREFIX = "thumbnails"
+MANIFEST_NAME = "manifest.json"
+
+
+def thumbnail_root():
+    return Path(getattr(settings, "RECIPE_THUMBNAIL_ROOT", settings.BASE_DIR / "static" / THUMBNAIL_PREFIX))
+
+
+def manifest_path():
+    return thumbnail_root() / MANIFEST_NAME
+
+
+_manifest = None
+_manifest_key = None
+_manifest_generation = 0
+_manifest_lock = threading.Lock()
+
+
+def load_manifest():
+    """The thumbnail manifest, re-read only when the file changes."""
+    global _manifest, _manifest_key, _manifest_generation
+    path = manifest_path()
+    try:
+        key = (path, path.stat().st_mtime_ns)
+    except FileNotFoundError:
+        key = None
+    with _manifest_lock:
+        if key != _manifest_key:
+            if key is None:
+                _manifest = {}
+            else:
+                with open(path, encoding="utf-8") as handle:
+                    _manifest = json.load(handle)
+            _manifest_key = key
+            _manifest_generation += 1
+        return _manifest if key is not None else {}
+
+
+def manifest_generation():
+    """Counter that changes whenever the manifest is (re)loaded; for cache keys."""
+    load_manifest()
+    return _manifest_generation
+
+
+def save_manifest(manifest):
+    path = manifest_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def build_thumbnails(pic):
+    """
+    Generate every rendition of the static image ``pic``.
+    Returns its manifest entry, or None if the source image is missing.
+    Existing files (same content hash) are left alone.
+    """
+    source = finders.find(pic)
+    if not source:
+        return None
+    stem = Path(pic).stem
+    digest = content_hash(source)
+    root = thumbnail_root()
+    root.mkdir(parents=True, exist_ok=True)
+
+    entry = {"hash": digest}
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original).convert("RGB")
+        for rendition, widths in RENDITIONS.items():
+            variants = {}
+            for fmt, options in FORMATS.items():
+                files = []
+                for width in widths:
+                    # Never upscale
+                    width = min(width, image.width)
+                    if any(item["width"] == width for item in files):
+                        continue
+                    name = f"{stem}.{digest}.{width}w.{'jpg' if fmt == 'jpeg' else fmt}"
+                    target = root / name
+                    if not target.exists():
+                        height = round(image.height * width / image.width)
+                        image.resize((width, height), Image.LANCZOS).save(target, **options)
+                    files.append({"path": f"{THUMBNAIL_PREFIX}/{name}", "width": width})
+                variants[fmt] = files
+            entry[rendition] = variants
+    return entry
+
+
+def update_manifest(pics):
+    """Build thumbnails for each picture and record them in the manifest."""
+    manifest = dict(load_manifest())
+    built = 0
+    for pic in pics:
+        try:
+            entry = build_thumbnails(pic)
+        except OSError:
+            logger.exception("Could not build thumbnails for %s", pic)
+            continue
+        if entry is None:
+            logger.warning("Source image not found: %s", pic)
+            continue
+        manifest[pic] = entry
+        built += 1
+    save_manifest(manifest)
+    return built
+
+
+def renditions_for(pic, rendition):
+    """Manifest variants {"webp": [...], "jpeg": [...]} for a picture, or None."""
+    entry = load_manifest().get(pic)
+    return entry.get(rendition) if entry else None
@@ -0,0 +1,174 @@
+"""
+Bulk recipe loading for partner feeds (see the import_recipes command).
+
+Rows are validated one by one, but everything else happens per batch:
+difficulty is computed with numpy over the whole batch, recipes are
+written with bulk_create, and the side tables that Recipe.save() and the
+signals normally maintain (ingredient index, search index, statistics
+rollup, catalogue version) are updated with a handful of bulk statements.
+"""
+import csv
+import json
+from collections import Counter
+
+import numpy as np
+from django.db import transaction
+
+from .cache import bump_catalogue_version
+from .models import (
+    MANY_INGREDIENTS,
+    QUICK_COOKING_MINUTES,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    count_ingredients,
+    normalize_ingredients,
+)
+from .search import get_search_backend
+from . import stats
+
+MEAL_TYPES = {value for value, _ in Recipe.MEAL_TYPE_CHOICES}
+NAME_MAX_LENGTH = Recipe._meta.get_field("name").max_length
+PIC_MAX_LENGTH = Recipe._meta.get_field("pic").max_length
+# Longest accepted prep or cooking time (a week); also keeps values well
+# inside the integer columns
+MAX_MINUTES = 7 * 24 * 60
+
+
+class RowError(ValueError):
+    """A source row that cannot be imported."""
+
+
+def read_rows(handle, fmt):
+    """Stream dict rows from a CSV or JSON Lines file handle."""
+    if fmt == "csv":
+        yield from csv.DictReader(handle)
+        return
+    for line_number, line in enumerate(handle, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            row = {"_raw": line, "_error": f"line {line_number}: invalid JSON ({error})"}
+        if not isinstance(row, dict):
+            row = {"_raw": line, "_error": f"line {line_number}: expected a JSON object"}
+        yield row
+
+
+def parse_minutes(value, field, default=None):
+    if value in (None, ""):
+        if default is None:
+            raise RowError(f"{field} is required")
+        return default
+    try:
+        minutes = int(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{field} must be a whole number of minutes")
+    if minutes < 0:
+        raise RowError(f"{field} cannot be negative")
+    if minutes > MAX_MINUTES:
+        raise RowError(f"{field} cannot be more than {MAX_MINUTES} minutes")
+    return minutes
+
+
+def parse_text(value, field, default=""):
+    """A text field, which JSON rows may give as a number, list or object."""
+    if value in (None, ""):
+        return default
+    if not isinstance(value, str):
+        raise RowError(f"{field} must be text")
+    return value
+
+
+def recipe_from_row(row, created_by=None):
+    """Validate one source row and build an unsaved Recipe (difficulty unset)."""
+    if "_error" in row:
+        raise RowError(row["_error"])
+    name = parse_text(row.get("name"), "name").strip()
+    if not name:
+        raise RowError("name is required")
+    if len(name) > NAME_MAX_LENGTH:
+        raise RowError(f"name is longer than {NAME_MAX_LENGTH} characters")
+    ingredients = parse_text(row.get("ingredients"), "ingredients").strip()
+    if not ingredients:
+        raise RowError("ingredients is required")
+    meal_type = parse_text(row.get("meal_type"), "meal_type", "dinner").strip().lower()
+    if meal_type not in MEAL_TYPES:
+        raise RowError(f"unknown meal_type {meal_type!r}")
+    pic = parse_text(row.get("pic"), "pic", Recipe._meta.get_field("pic").default).strip()
+    if len(pic) > PIC_MAX_LENGTH:
+        raise RowError(f"pic is longer than {PIC_MAX_LENGTH} characters")
+
+    return Recipe(
+        name=name,
+        description=parse_text(row.get("description"), "description"),
+        instructions=parse_text(row.get("instructions"), "instructions"),
+        ingredients=ingredients,
+        prep_time=parse_minutes(row.get("prep_time"), "prep_time", default=5),
+        cooking_time=parse_minutes(row.get("cooking_time"), "cooking_time"),
+        meal_type=meal_type,
+        pic=pic,
+        created_by=created_by,
+    )
+
+
+def batch_difficulties(cooking_times, ingredient_counts):
+    """
+    Vectorized models.difficulty_for(): quick recipes are easy, others
+    medium, and many ingredients moves either up one level.
+    """
+    quick = np.asarray(cooking_times) < QUICK_COOKING_MINUTES
+    many = np.asarray(ingredient_counts) >= MANY_INGREDIENTS
+    return np.where(
+        quick, np.where(many, "medium", "easy"), np.where(many, "hard", "medium")
+    ).tolist()
+
+
+def bulk_insert_recipes(recipes):
+    """
+    Insert a batch of unsaved recipes and update everything that
+    Recipe.save() and the Recipe signals would have. Returns the saved
+    recipes (with primary keys).
+    """
+    if not recipes:
+        return []
+    names_per_recipe = [normalize_ingredients(recipe.ingredients) for recipe in recipes]
+    for recipe in recipes:
+        recipe.ingredient_count = count_ingredients(recipe.ingredients)
+    difficulties = batch_difficulties(
+        [recipe.cooking_time for recipe in recipes],
+        [recipe.ingredient_count for recipe in recipes],
+    )
+    for recipe, difficulty in zip(recipes, difficulties):
+        recipe.difficulty = difficulty
+
+    with transaction.atomic():
+        recipes = Recipe.objects.bulk_create(recipes)
+
+        # Normalized ingredient index
+        all_names = {name for names in names_per_recipe for name in names}
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name) for name in all_names], ignore_conflicts=True
+        )
+        ids = dict(Ingredient.objects.filter(name__in=all_names).values_list("name", "id"))
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(recipe_id=recipe.pk, ingredient_id=ids[name])
+                for recipe, names in zip(recipes, names_per_recipe)
+                for name in names
+            ]
+        )
+
+        # Full-text search index and statistics rollup
+        get_search_backend().index_many(recipes)
+        deltas = Counter()
+        for recipe in recipes:
+            deltas.update(stats.stats_keys(
+                {field: getattr(recipe, field) for field in stats.STATS_FIELDS}
+            ))
+        stats.apply_deltas(deltas)
+
+    bump_catalogue_version()
+    return recipes
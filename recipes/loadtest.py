@@ -0,0 +1,295 @@
+"""
+Concurrent load tests against the real WSGI app (see ``manage.py loadtest``).
+
+The app runs under gunicorn with the configured database, exactly as in
+production, while simulated users in this process replay a weighted mix
+of traffic over plain HTTP:
+
+- ``browse``: anonymous visits to the welcome, about and recipe pages,
+- ``list``: logged-in recipe list,
+- ``search``: logged-in header search,
+- ``advanced_search``: anonymous advanced search (draws the charts),
+- ``favourite``: logged-in favourite toggles (database writes).
+
+Each simulated user sends its next request as soon as the previous one
+is answered (plus an optional think time), so throughput is what the
+server can sustain at that concurrency. Logged-in users get a session
+created directly in the database; no login requests are made. The
+sessions are deleted when the run ends.
+"""
+import http.client
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from .bench import (
+    ADJECTIVES, DISHES, INGREDIENTS, MEAL_TYPES, USERNAME_PREFIX, percentile, recipe_id_range,
+)
+
+DEFAULT_MIX = {"browse": 40, "list": 15, "search": 20, "advanced_search": 10, "favourite": 15}
+LOGGED_IN = {"list", "search", "favourite"}
+
+
+def parse_mix(value):
+    """'browse=4,search=2' -> {"browse": 4, "search": 2}."""
+    mix = {}
+    for part in filter(None, (part.strip() for part in value.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown scenario {name!r}; choose from {', '.join(DEFAULT_MIX)}.")
+        mix[name] = float(weight) if weight else 1.0
+    if not mix or not any(mix.values()):
+        raise ValueError("The mix needs at least one scenario with a positive weight.")
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Gunicorn:
+    """``recipe_app.wsgi`` under gunicorn on a free local port, for a ``with`` block."""
+
+    def __init__(self, workers, threads, startup_timeout=30):
+        self.workers = workers
+        self.threads = threads
+        self.startup_timeout = startup_timeout
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.process = None
+        # A file rather than a pipe, so a chatty server can't block on a full pipe
+        self.log = tempfile.TemporaryFile(mode="w+")
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "gunicorn", "recipe_app.wsgi:application",
+                "--bind", f"127.0.0.1:{self.port}",
+                "--workers", str(self.workers),
+                "--threads", str(self.threads),
+                "--log-level", "warning",
+            ],
+            cwd=settings.BASE_DIR,
+            # So settings size per-worker resources for this many workers
+            env={**os.environ, "WEB_CONCURRENCY": str(self.workers)},
+            stdout=self.log,
+            stderr=subprocess.STDOUT,
+        )
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited on start-up:\n{self.output()}")
+            try:
+                status, _ = fetch(self.url, "GET", reverse("about"), timeout=2)
+                if status < 500:
+                    return self
+            except OSError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"gunicorn did not answer within {self.startup_timeout} s.")
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def output(self):
+        self.log.seek(0)
+        return self.log.read()
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.log.close()
+
+
+def fetch(base_url, method, path, body=None, headers=None, timeout=30):
+    """One request on a fresh connection; returns (status, seconds)."""
+    parts = urlsplit(base_url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+    started = time.perf_counter()
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - started
+    finally:
+        connection.close()
+
+
+def accounts(count):
+    """
+    ``count`` benchmark users (see ``manage.py bench``), creating any that
+    are missing. New ones can't log in: they only get sessions made here.
+    """
+    existing = set(
+        User.objects.filter(username__startswith=USERNAME_PREFIX).values_list("username", flat=True)
+    )
+    password = make_password(None)
+    User.objects.bulk_create([
+        User(username=username, password=password)
+        for username in (f"{USERNAME_PREFIX}{number}" for number in range(count))
+        if username not in existing
+    ])
+    return list(
+        User.objects.filter(username__startswith=USERNAME_PREFIX).order_by("id")[:count]
+    )
+
+
+def login_cookies(user):
+    """Session and CSRF cookies for ``user``, as Client.force_login() would set up."""
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return {
+        settings.SESSION_COOKIE_NAME: session.session_key,
+        settings.CSRF_COOKIE_NAME: get_random_string(32),
+    }
+
+
+class SimulatedUser:
+    """One closed-loop client: pick a scenario, send it, repeat."""
+
+    def __init__(self, base_url, mix, cookies, recipe_ids, seed, timeout=30, think_time=0.0):
+        self.base_url = base_url
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        self.rng = random.Random(seed)
+        self.timeout = timeout
+        self.think_time = think_time
+        self.cookies = cookies
+        self.first_id, self.last_id = recipe_ids
+        self.results = []
+
+    def request_for(self, name):
+        """(method, path, body) for one request of scenario ``name``."""
+        rng = self.rng
+        if name == "browse":
+            path = rng.choice((
+                reverse("recipes:welcome"),
+                reverse("about"),
+                reverse("recipes:recipe_detail", args=[rng.randint(self.first_id, self.last_id)]),
+                reverse("recipes:recipe_detail", args=[rng.randint(self.first_id, self.last_id)]),
+            ))
+            return "GET", path, None
+        if name == "list":
+            return "GET", reverse("recipes:recipe_list"), None
+        if name == "search":
+            query = urlencode({"q": rng.choice(INGREDIENTS)})
+            return "GET", f"{reverse('recipes:search_recipes')}?{query}", None
+        if name == "advanced_search":
+            query = urlencode(rng.choice((
+                {"name": rng.choice(DISHES)},
+                {"ingredient": rng.choice(INGREDIENTS)},
+                {"meal_type": rng.choice(MEAL_TYPES), "max_cooking_time": 30},
+                {"difficulty": rng.choice(("easy", "medium", "hard")), "name": rng.choice(ADJECTIVES)},
+            )))
+            return "GET", f"{reverse('recipes:advanced_search')}?{query}", None
+        recipe_id = rng.randint(self.first_id, self.last_id)
+        return "POST", reverse("users:toggle_favourite", args=[recipe_id]), ""
+
+    def headers_for(self, name, method):
+        if name not in LOGGED_IN:
+            return {}
+        headers = {"Cookie": "; ".join(f"{key}={value}" for key, value in self.cookies.items())}
+        if method == "POST":
+            headers["X-CSRFToken"] = self.cookies[settings.CSRF_COOKIE_NAME]
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        return headers
+
+    def run(self, deadline):
+        while time.monotonic() < deadline:
+            name = self.rng.choices(self.names, self.weights)[0]
+            method, path, body = self.request_for(name)
+            started = time.perf_counter()
+            try:
+                status, seconds = fetch(
+                    self.base_url, method, path, body, self.headers_for(name, method), self.timeout
+                )
+            except OSError as error:
+                status, seconds = type(error).__name__, time.perf_counter() - started
+            self.results.append((name, status, seconds))
+            if self.think_time:
+                time.sleep(self.rng.expovariate(1 / self.think_time))
+
+
+def run_load(base_url, mix, users, duration, seed=42, timeout=30, think_time=0.0):
+    """Run ``len(users)`` simulated users for ``duration`` seconds; returns their results."""
+    recipe_ids = recipe_id_range()
+    cookies = []
+    try:
+        for user in users:
+            cookies.append(login_cookies(user))
+        clients = [
+            SimulatedUser(base_url, mix, user_cookies, recipe_ids, seed + number, timeout, think_time)
+            for number, user_cookies in enumerate(cookies)
+        ]
+        deadline = time.monotonic() + duration
+        threads = [threading.Thread(target=client.run, args=(deadline,)) for client in clients]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        Session.objects.filter(
+            session_key__in=[user_cookies[settings.SESSION_COOKIE_NAME] for user_cookies in cookies]
+        ).delete()
+    return [result for client in clients for result in client.results], elapsed
+
+
+def is_error(status):
+    return not isinstance(status, int) or status >= 400
+
+
+def summarise(results, elapsed):
+    """Throughput, latency percentiles and errors, overall and per scenario."""
+    def stats(rows):
+        latencies = sorted(seconds * 1000 for _, _, seconds in rows)
+        errors = sum(1 for _, status, _ in rows if is_error(status))
+        statuses = {}
+        for _, status, _ in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            "requests": len(rows),
+            "throughput_rps": round(len(rows) / elapsed, 2) if elapsed else None,
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 2) if rows else None,
+            "p95_ms": round(percentile(latencies, 95), 2) if rows else None,
+            "p99_ms": round(percentile(latencies, 99), 2) if rows else None,
+            "max_ms": round(latencies[-1], 2) if rows else None,
+            "mean_ms": round(statistics.fmean(latencies), 2) if rows else None,
+            "statuses": dict(sorted(statuses.items())),
+        }
+
+    names = sorted({name for name, _, _ in results})
+    return {
+        **stats(results),
+        "scenarios": {name: stats([row for row in results if row[0] == name]) for name in names},
+    }
@@ -0,0 +1,112 @@
+import json
+import sys
+import time
+from contextlib import redirect_stdout
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from recipes import bench
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the main views on a synthetic catalogue and print p50/p95/p99 "
+        "latency, query counts and peak memory per request as JSON. Runs in a "
+        "throwaway test database unless --in-place is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size", default="1k",
+            help="Catalogue size: 1k, 100k, 1m or a number of recipes (default: 1k).",
+        )
+        parser.add_argument("--users", type=int, default=bench.DEFAULT_USERS, help="Users with favourites.")
+        parser.add_argument("--iterations", type=int, default=50, help="Measured requests per view.")
+        parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per view first.")
+        parser.add_argument("--seed", type=int, default=42, help="Seed for the catalogue and the requests.")
+        parser.add_argument("--output", help="Write the JSON report to this file as well.")
+        parser.add_argument(
+            "--keepdb", action="store_true",
+            help="Keep the test database (and its catalogue) for the next run.",
+        )
+        parser.add_argument(
+            "--in-place", action="store_true",
+            help="Use the configured database as is (it must be empty or hold a previous bench catalogue).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            size = bench.parse_size(options["size"])
+        except ValueError:
+            raise CommandError(f"Invalid --size {options['size']!r}.")
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1.")
+
+        try:
+            # Lets the test client through ALLOWED_HOSTS, among other things
+            setup_test_environment()
+            set_up = True
+        except RuntimeError:
+            # Already set up, e.g. when called from a test
+            set_up = False
+        old_name = None
+        if not options["in_place"]:
+            old_name = connection.settings_dict["NAME"]
+            # createcachetable reports on stdout, which carries the report
+            with redirect_stdout(sys.stderr):
+                connection.creation.create_test_db(
+                    verbosity=0, autoclobber=True, serialize=False, keepdb=options["keepdb"]
+                )
+        try:
+            report = self.run(size, options)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+            if set_up:
+                teardown_test_environment()
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as handle:
+                handle.write(output + "\n")
+
+    def run(self, size, options):
+        existing = Recipe.objects.count()
+        generated_in = None
+        counts = None
+        if existing not in (0, size):
+            raise CommandError(
+                f"The database holds {existing} recipes; expected none or a {size}-recipe catalogue."
+            )
+        if existing == 0:
+            self.stderr.write(f"Generating {size} recipes...")
+            started = time.perf_counter()
+            recipes, users, favourites = bench.generate_catalogue(
+                size, options["users"], options["seed"], log=self.stderr.write
+            )
+            counts = {"recipes": recipes, "users": users, "favourites": favourites}
+            generated_in = round(time.perf_counter() - started, 2)
+
+        results = {}
+        for scenario in bench.scenarios(options["seed"]):
+            self.stderr.write(f"Running {scenario.name}...")
+            results[scenario.name] = scenario.run(options["iterations"], options["warmup"])
+
+        return {
+            "revision": bench.git_revision(),
+            "database": connection.vendor,
+            "size": size,
+            "seed": options["seed"],
+            "iterations": options["iterations"],
+            "chart_workers": getattr(settings, "RECIPE_CHART_WORKERS", None),
+            "generated": counts,
+            "generated_in_s": generated_in,
+            "peak_rss_mb": bench.peak_rss_mb(),
+            "views": results,
+        }
+
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.images import update_manifest
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate card and detail thumbnails (WebP + JPEG) for recipe pictures "
+        "and update the thumbnail manifest. Run before collectstatic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "pics", nargs="*",
+            help="Static paths to process (default: every picture used by a recipe).",
+        )
+
+    def handle(self, *args, **options):
+        pics = options["pics"] or list(
+            Recipe.objects.order_by().values_list("pic", flat=True).distinct()
+        )
+        started = time.monotonic()
+        built = update_manifest(pics)
+        self.stdout.write(self.style.SUCCESS(
+            f"Built thumbnails for {built} of {len(pics)} pictures "
+            f"in {time.monotonic() - started:.1f}s."
+        ))
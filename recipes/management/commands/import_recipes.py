@@ -0,0 +1,86 @@
+import json
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.importer import RowError, bulk_insert_recipes, read_rows, recipe_from_row
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Import recipes from a CSV or JSON Lines file, streaming it in batches. "
+        "Rows that fail validation are written to a rejects file instead of aborting."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSON Lines file to import.")
+        parser.add_argument(
+            "--format", choices=sorted(set(FORMATS.values())),
+            help="Input format (default: guessed from the file extension).",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Recipes inserted per transaction (default: 1000).",
+        )
+        parser.add_argument(
+            "--rejects",
+            help="Where to write rejected rows as JSON Lines (default: <path>.rejects.jsonl).",
+        )
+        parser.add_argument("--user", help="Username to record as the creator of imported recipes.")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.is_file():
+            raise CommandError(f"No such file: {path}")
+        fmt = options["format"] or FORMATS.get(path.suffix.lower())
+        if fmt is None:
+            raise CommandError("Cannot guess the input format; pass --format csv or --format jsonl.")
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        created_by = None
+        if options["user"]:
+            try:
+                created_by = get_user_model().objects.get(username=options["user"])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Unknown user {options['user']!r}.")
+
+        rejects_path = Path(options["rejects"] or f"{path}.rejects.jsonl")
+        imported = rejected = 0
+        started = time.perf_counter()
+
+        with open(path, newline="", encoding="utf-8") as source, \
+                open(rejects_path, "w", encoding="utf-8") as rejects:
+            batch = []
+            for row_number, row in enumerate(read_rows(source, fmt), start=1):
+                try:
+                    batch.append(recipe_from_row(row, created_by))
+                except RowError as error:
+                    rejected += 1
+                    rejects.write(json.dumps({"row": row_number, "error": str(error), "data": row}) + "\n")
+                    continue
+                if len(batch) >= batch_size:
+                    imported += len(bulk_insert_recipes(batch))
+                    batch = []
+                    self.report_progress(imported, rejected, started)
+            imported += len(bulk_insert_recipes(batch))
+
+        elapsed = time.perf_counter() - started
+        rate = imported / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} recipes in {elapsed:.1f}s ({rate:,.0f} rows/s)."
+        ))
+        if rejected:
+            self.stdout.write(self.style.WARNING(f"Rejected {rejected} rows; see {rejects_path}."))
+        else:
+            rejects_path.unlink()
+
+    def report_progress(self, imported, rejected, started):
+        elapsed = time.perf_counter() - started
+        rate = imported / elapsed if elapsed else 0.0
+        self.stdout.write(f"  {imported} imported, {rejected} rejected ({rate:,.0f} rows/s)")
@@ -0,0 +1,104 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+# Boot the project the way a web worker does: set up Django and load the URLconf
+BOOT_SCRIPT = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(output):
+    """
+    Parse ``python -X importtime`` output into (module, self_us, cumulative_us,
+    depth) tuples.
+    """
+    entries = []
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def owning_app(module, app_names):
+    for app_name in app_names:
+        if module == app_name or module.startswith(app_name + "."):
+            return app_name
+    return None
+
+
+def app_totals(entries, app_names):
+    """
+    Sum the cumulative import time of each app's outermost modules, i.e.
+    modules of the app that were not imported by another module of the
+    same app, so nested imports are not counted twice.
+    """
+    totals = defaultdict(int)
+    ancestors = []  # (depth, app) for the import chain of the current entry
+    # importtime prints children before their parent; reversed, parents come first
+    for module, _, cumulative_us, depth in reversed(entries):
+        while ancestors and ancestors[-1][0] >= depth:
+            ancestors.pop()
+        app_name = owning_app(module, app_names)
+        if app_name and all(app != app_name for _, app in ancestors):
+            totals[app_name] += cumulative_us
+        ancestors.append((depth, app_name))
+    return totals
+
+
+class Command(BaseCommand):
+    help = (
+        "Report how much each package (and each installed app) adds to "
+        "worker start-up time, measured with python -X importtime."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top", type=int, default=15,
+            help="Number of packages to list (default: 15).",
+        )
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", BOOT_SCRIPT],
+            capture_output=True,
+            text=True,
+            env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        )
+        if result.returncode != 0:
+            self.stderr.write(result.stderr)
+            return
+        entries = parse_importtime(result.stderr)
+
+        # Self time summed per top-level package
+        per_package = defaultdict(int)
+        for module, self_us, _, _ in entries:
+            per_package[module.split(".")[0]] += self_us
+        total_us = sum(per_package.values())
+
+        self.stdout.write(f"Total import time: {total_us / 1000:.1f} ms\n")
+        self.stdout.write(f"{'package':<30} {'ms':>9} {'share':>7}")
+        for package, self_us in sorted(per_package.items(), key=lambda item: -item[1])[: options["top"]]:
+            self.stdout.write(f"{package:<30} {self_us / 1000:>9.1f} {self_us / total_us:>7.1%}")
+
+        # Cumulative time of each app's outermost imports (what the app pulls in)
+        app_names = [
+            config.name for config in apps.get_app_configs()
+            if not config.name.startswith("django.")
+        ]
+        app_names.append(os.environ["DJANGO_SETTINGS_MODULE"].split(".")[0])
+        self.stdout.write("\nPer app (cumulative, including third-party imports):")
+        for app_name, cumulative_us in sorted(
+            app_totals(entries, app_names).items(), key=lambda item: -item[1]
+        ):
+            self.stdout.write(f"{app_name:<30} {cumulative_us / 1000:>9.1f} ms")
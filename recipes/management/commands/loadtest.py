@@ -0,0 +1,124 @@
+import json
+import os
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import bench, loadtest
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the app under gunicorn with concurrent simulated users replaying a "
+        "weighted mix of browsing, listing, searching and favouriting. Prints throughput, "
+        "latency percentiles and error rates as JSON. Uses the configured database, "
+        "so it refuses to run against what looks like production unless --i-know is "
+        "given. The benchmark users and sessions it creates are deleted afterwards; "
+        "a catalogue made with --generate is kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes.")
+        parser.add_argument("--threads", type=int, default=1, help="Threads per gunicorn worker.")
+        parser.add_argument("--concurrency", type=int, default=10, help="Simulated users.")
+        parser.add_argument("--duration", type=float, default=30, help="Seconds to run for.")
+        parser.add_argument(
+            "--mix",
+            default=",".join(f"{name}={weight}" for name, weight in loadtest.DEFAULT_MIX.items()),
+            help="Scenario weights (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--think-time", type=float, default=0,
+            help="Mean pause between a user's requests, in ms (default: none).",
+        )
+        parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--url",
+            help="Test a server that is already running instead of starting gunicorn "
+                 "(it must use the same database).",
+        )
+        parser.add_argument(
+            "--generate", metavar="SIZE",
+            help="Generate a benchmark catalogue of this size first if there are no recipes.",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file as well.")
+        parser.add_argument(
+            "--i-know", action="store_true",
+            help="Run even though DEBUG is off or DATABASE_URL is set (e.g. a staging database).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadtest.parse_mix(options["mix"])
+        except ValueError as error:
+            raise CommandError(error)
+        if options["concurrency"] < 1 or options["duration"] <= 0:
+            raise CommandError("--concurrency and --duration must be positive.")
+        if (not settings.DEBUG or os.environ.get("DATABASE_URL")) and not options["i_know"]:
+            raise CommandError(
+                "This writes users, sessions and favourites to the configured database, which "
+                "looks like production (DEBUG is off or DATABASE_URL is set). Use a development "
+                "database, or pass --i-know."
+            )
+
+        existing_users = set(
+            User.objects.filter(username__startswith=bench.USERNAME_PREFIX).values_list("id", flat=True)
+        )
+        try:
+            report = self.load(mix, options)
+        finally:
+            # Their favourites go with them
+            User.objects.filter(username__startswith=bench.USERNAME_PREFIX).exclude(
+                id__in=existing_users
+            ).delete()
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as handle:
+                handle.write(output + "\n")
+
+    def load(self, mix, options):
+        if not Recipe.objects.exists():
+            if not options["generate"]:
+                raise CommandError("There are no recipes; pass --generate 1k to create a catalogue.")
+            self.stderr.write(f"Generating {options['generate']} recipes...")
+            bench.generate_catalogue(
+                bench.parse_size(options["generate"]), options["concurrency"], options["seed"],
+                log=self.stderr.write,
+            )
+        users = loadtest.accounts(options["concurrency"])
+
+        if options["url"]:
+            report = self.run(options["url"].rstrip("/"), mix, users, options)
+        else:
+            self.stderr.write(
+                f"Starting gunicorn with {options['workers']} workers x {options['threads']} threads..."
+            )
+            try:
+                with loadtest.Gunicorn(options["workers"], options["threads"]) as server:
+                    report = self.run(server.url, mix, users, options)
+            except RuntimeError as error:
+                raise CommandError(error)
+            report["server"] = {"workers": options["workers"], "threads": options["threads"]}
+        return report
+
+    def run(self, url, mix, users, options):
+        self.stderr.write(f"Running {len(users)} users against {url} for {options['duration']} s...")
+        results, elapsed = loadtest.run_load(
+            url, mix, users, options["duration"],
+            seed=options["seed"], timeout=options["timeout"],
+            think_time=options["think_time"] / 1000,
+        )
+        return {
+            "target": url,
+            "revision": bench.git_revision(),
+            "concurrency": len(users),
+            "duration_s": round(elapsed, 2),
+            "mix": mix,
+            **loadtest.summarise(results, elapsed),
+        }
+
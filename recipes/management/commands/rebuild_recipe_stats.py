@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the RecipeStats rollup from scratch and verify it against the recipe table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check", action="store_true",
+            help="Only verify the current rollup; do not rebuild it.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["check"]:
+            counts = stats.rebuild()
+            self.stdout.write(f"Rebuilt {len(counts)} statistics rows.")
+
+        mismatches = stats.verify()
+        if mismatches:
+            for (dimension, value), (stored, expected) in sorted(mismatches.items()):
+                self.stderr.write(f"{dimension}={value}: stored {stored}, expected {expected}")
+            raise CommandError(f"{len(mismatches)} statistics rows do not match the recipe table.")
+        self.stdout.write(self.style.SUCCESS("Recipe statistics verified."))
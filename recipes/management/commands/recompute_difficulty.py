@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import Now
+
+from recipes import stats
+from recipes.cache import bump_catalogue_version, purge_all_recipe_pages
+from recipes.models import Recipe, count_ingredients, difficulty_expression
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-derive every recipe's difficulty from the current rules with one "
+        "set-based UPDATE, then rebuild the statistics rollup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only report how many recipes would change difficulty.",
+        )
+        parser.add_argument(
+            "--recount", action="store_true",
+            help="Recount ingredient_count from the ingredients text first (skipped with --dry-run).",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=2000,
+            help="Rows per bulk_update when recounting (default: 2000).",
+        )
+
+    def handle(self, *args, **options):
+        if options["recount"] and not options["dry_run"]:
+            updated = self.recount(options["batch_size"])
+            self.stdout.write(f"Recounted ingredients for {updated} recipes.")
+
+        new_difficulty = difficulty_expression()
+        changed = Recipe.objects.exclude(difficulty=new_difficulty)
+        transitions = (
+            changed.annotate(new_difficulty=new_difficulty)
+            .values("difficulty", "new_difficulty")
+            .annotate(recipes=Count("id"))
+            .order_by("difficulty", "new_difficulty")
+        )
+        total = 0
+        for row in transitions:
+            total += row["recipes"]
+            self.stdout.write(
+                f"  {row['difficulty'] or '(none)'} -> {row['new_difficulty']}: {row['recipes']}"
+            )
+
+        if options["dry_run"]:
+            self.stdout.write(f"{total} recipes would change difficulty (dry run).")
+            return
+        if total:
+            with transaction.atomic():
+                updated = changed.update(difficulty=new_difficulty, updated_at=Now())
+                # update() bypasses the signals that keep the rollup in step
+                stats.rebuild()
+            bump_catalogue_version()
+            purge_all_recipe_pages()
+        else:
+            updated = 0
+        self.stdout.write(self.style.SUCCESS(f"Updated difficulty for {updated} recipes."))
+
+    def recount(self, batch_size):
+        updated = 0
+        batch = []
+        recipes = Recipe.objects.only("id", "ingredients", "ingredient_count")
+        for recipe in recipes.iterator(chunk_size=batch_size):
+            count = count_ingredients(recipe.ingredients)
+            if count != recipe.ingredient_count:
+                recipe.ingredient_count = count
+                batch.append(recipe)
+            if len(batch) >= batch_size:
+                updated += Recipe.objects.bulk_update(batch, ["ingredient_count"])
+                batch = []
+        if batch:
+            updated += Recipe.objects.bulk_update(batch, ["ingredient_count"])
+        return updated
@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from recipe_app import slow_queries
+
+
+class Command(BaseCommand):
+    help = "Dump the slow-query log (newest first), with each query's EXPLAIN plan."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, help="Show at most this many entries.")
+        parser.add_argument("--json", action="store_true", help="Print the entries as JSON Lines.")
+        parser.add_argument("--clear", action="store_true", help="Empty the log after dumping it.")
+
+    def handle(self, *args, **options):
+        entries = slow_queries.entries(options["limit"])
+        for entry in entries:
+            if options["json"]:
+                self.stdout.write(json.dumps(entry))
+                continue
+            self.stdout.write(self.style.WARNING(
+                f"{entry['duration_ms']} ms  {entry['view'] or '(no view)'}  "
+                f"{entry['method'] or ''} {entry['url'] or ''}  [{entry['time']}]"
+            ))
+            self.stdout.write(f"  SQL:    {entry['sql']}")
+            self.stdout.write(f"  Params: {entry['params']}")
+            for line in entry["plan"] or ["(no plan)"]:
+                self.stdout.write(f"  Plan:   {line}")
+        if not options["json"]:
+            self.stdout.write(f"{len(entries)} slow queries logged.")
+        if options["clear"]:
+            slow_queries.clear()
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_ingredient_index(apps, schema_editor):
+    """Populate the normalized ingredient index for existing recipes."""
+    Recipe = apps.get_model("recipes", "Recipe")
+    Ingredient = apps.get_model("recipes", "Ingredient")
+    RecipeIngredient = apps.get_model("recipes", "RecipeIngredient")
+
+    pairs = []
+    for recipe_id, text in Recipe.objects.values_list("id", "ingredients").iterator():
+        seen = set()
+        for item in (text or "").split(","):
+            name = item.strip().lower()[:100]
+            if name and name not in seen:
+                seen.add(name)
+                pairs.append((recipe_id, name))
+
+    Ingredient.objects.bulk_create(
+        [Ingredient(name=name) for name in {name for _, name in pairs}],
+        ignore_conflicts=True,
+    )
+    ids = dict(Ingredient.objects.values_list("name", "id"))
+    RecipeIngredient.objects.bulk_create(
+        [RecipeIngredient(recipe_id=recipe_id, ingredient_id=ids[name]) for recipe_id, name in pairs],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_alter_recipe_pic'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.ingredient')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.recipe')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_index',
+            field=models.ManyToManyField(blank=True, related_name='recipes', through='recipes.RecipeIngredient', to='recipes.ingredient'),
+        ),
+        migrations.AddIndex(
+            model_name='recipeingredient',
+            index=models.Index(fields=['ingredient', 'recipe'], name='recipe_ingr_ingr_recipe_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='recipeingredient',
+            unique_together={('recipe', 'ingredient')},
+        ),
+        migrations.RunPython(backfill_ingredient_index, migrations.RunPython.noop),
+    ]
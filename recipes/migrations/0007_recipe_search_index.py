@@ -0,0 +1,57 @@
+from django.db import OperationalError, migrations, transaction
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Create the database-specific full-text index used by recipes.search
+    and fill it from the existing rows.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        # SQLite builds without FTS5 have no such module; leave the table
+        # out so recipes.search falls back to SimpleSearchBackend
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                schema_editor.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS recipes_recipe_fts "
+                    "USING fts5(name, ingredients)"
+                )
+        except OperationalError:
+            return
+        schema_editor.execute(
+            "INSERT INTO recipes_recipe_fts (rowid, name, ingredients) "
+            "SELECT id, name, ingredients FROM recipes_recipe"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            "ALTER TABLE recipes_recipe ADD COLUMN IF NOT EXISTS search_vector tsvector"
+        )
+        schema_editor.execute(
+            "UPDATE recipes_recipe SET search_vector = "
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(ingredients, '')), 'B')"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_gin "
+            "ON recipes_recipe USING GIN (search_vector)"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS recipes_recipe_fts")
+    elif vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS recipes_recipe_search_vector_gin")
+        schema_editor.execute("ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_ingredient_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['name', 'id'], name='recipe_name_id_idx'),
+        ),
+    ]
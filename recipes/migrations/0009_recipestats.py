@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:30
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def populate_recipe_stats(apps, schema_editor):
+    """Fill the rollup from the existing recipes."""
+    Recipe = apps.get_model("recipes", "Recipe")
+    RecipeStats = apps.get_model("recipes", "RecipeStats")
+
+    # Same bands as recipes.analytics.COOKING_TIME_BANDS
+    def band(minutes):
+        if minutes <= 0:
+            return "no-cook"
+        if minutes <= 9:
+            return "under-10"
+        if minutes <= 29:
+            return "10-29"
+        if minutes <= 59:
+            return "30-59"
+        return "60+"
+
+    counts = Counter()
+    rows = Recipe.objects.values_list("meal_type", "difficulty", "cooking_time").iterator()
+    for meal_type, difficulty, cooking_time in rows:
+        counts[("meal_type", meal_type)] += 1
+        counts[("difficulty", difficulty)] += 1
+        counts[("cooking_time_band", band(cooking_time))] += 1
+    RecipeStats.objects.bulk_create(
+        [
+            RecipeStats(dimension=dimension, value=value, count=count)
+            for (dimension, value), count in counts.items()
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_name_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Recipe stats',
+                'unique_together': {('dimension', 'value')},
+            },
+        ),
+        migrations.RunPython(populate_recipe_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:45
+
+from django.db import migrations, models
+
+
+def backfill_ingredient_count(apps, schema_editor):
+    """Count each recipe's listed ingredients, in chunks."""
+    Recipe = apps.get_model("recipes", "Recipe")
+    batch = []
+    for recipe in Recipe.objects.only("id", "ingredients").iterator(chunk_size=2000):
+        recipe.ingredient_count = len([i for i in (recipe.ingredients or "").split(",") if i.strip()])
+        batch.append(recipe)
+        if len(batch) >= 2000:
+            Recipe.objects.bulk_update(batch, ["ingredient_count"])
+            batch = []
+    Recipe.objects.bulk_update(batch, ["ingredient_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipestats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of listed ingredients, stored when saving'),
+        ),
+        migrations.RunPython(backfill_ingredient_count, migrations.RunPython.noop),
+    ]
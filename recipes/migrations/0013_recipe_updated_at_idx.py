@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['updated_at'], name='recipe_updated_at_idx'),
+        ),
+    ]
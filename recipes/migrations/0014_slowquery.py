@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 20:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry', models.JSONField()),
+            ],
+            options={
+                'verbose_name_plural': 'Slow queries',
+            },
+        ),
+    ]
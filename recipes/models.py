@@ -1,7 +1,89 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Exists, OuterRef, Q, Value, When
 from django.contrib.auth.models import User
 
 
+def normalize_ingredients(text):
+    """
+    Split a comma-separated ingredients string into a list of
+    unique, lower-cased ingredient names (order preserved).
+    """
+    names = []
+    for item in (text or "").split(","):
+        name = item.strip().lower()[:100]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+class Ingredient(models.Model):
+    """
+    A single normalized ingredient name, shared by every recipe
+    that lists it. Names are stored lower-cased and unique.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeQuerySet(models.QuerySet):
+    def with_ingredient(self, term):
+        """
+        Keep recipes with an ingredient containing ``term``.
+        Matches the old ``ingredients__icontains`` behaviour, but the
+        substring scan runs over the (small) Ingredient table and the
+        recipes are reached through the indexed through-table.
+        """
+        return self.filter(ingredient_match(term))
+
+
+def ingredient_match(term):
+    """EXISTS expression: does the outer recipe list an ingredient containing ``term``?"""
+    return Exists(
+        RecipeIngredient.objects.filter(
+            recipe=OuterRef("pk"),
+            ingredient__name__contains=term.strip().lower(),
+        )
+    )
+
+
+# --- Difficulty rules ---
+# Cooking time under QUICK_COOKING_MINUTES is easy, otherwise medium; listing
+# MANY_INGREDIENTS or more moves a recipe up one level. Run
+# ``manage.py recompute_difficulty`` after changing these.
+QUICK_COOKING_MINUTES = 10
+MANY_INGREDIENTS = 4
+
+
+def count_ingredients(text):
+    """Number of non-empty entries in a comma-separated ingredients string."""
+    return len([i for i in (text or "").split(",") if i.strip()])
+
+
+def difficulty_for(cooking_time, ingredient_count):
+    if cooking_time < QUICK_COOKING_MINUTES:
+        # Includes no-cook recipes
+        return "easy" if ingredient_count < MANY_INGREDIENTS else "medium"
+    return "medium" if ingredient_count < MANY_INGREDIENTS else "hard"
+
+
+def difficulty_expression():
+    """The difficulty rules as a SQL CASE over cooking_time and ingredient_count."""
+    many = Q(ingredient_count__gte=MANY_INGREDIENTS)
+    quick = Q(cooking_time__lt=QUICK_COOKING_MINUTES)
+    return Case(
+        When(quick & ~many, then=Value("easy")),
+        When(~quick & many, then=Value("hard")),
+        default=Value("medium"),
+        output_field=models.CharField(),
+    )
+
+
 class Recipe(models.Model):
     """
     Recipe model stores all details of a recipe,
@@ -53,6 +135,11 @@ class Recipe(models.Model):
         choices=MEAL_TYPE_CHOICES,
         default="dinner"
     )
+    ingredient_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of listed ingredients, stored when saving"
+    )
 
     # --- Media and ownership ---
     pic = models.CharField(
@@ -68,6 +155,30 @@ class Recipe(models.Model):
         related_name="recipes_created"
     )
 
+    # --- Change tracking (conditional GET / cache keys) ---
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # --- Normalized ingredient index (kept in sync by save()) ---
+    ingredient_index = models.ManyToManyField(
+        Ingredient,
+        through="RecipeIngredient",
+        related_name="recipes",
+        blank=True,
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    # Columns read by recipes/recipe_card.html and its cache key (use with .only())
+    CARD_FIELDS = ("id", "name", "pic", "updated_at")
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the main list: ORDER BY name, id
+            models.Index(fields=["name", "id"], name="recipe_name_id_idx"),
+            # Latest change, for the list's ETag (see recipes/conditional.py)
+            models.Index(fields=["updated_at"], name="recipe_updated_at_idx"),
+        ]
+
     def __str__(self):
         """Readable string representation for admin and shell."""
         formatted_ingredients = (
@@ -86,20 +197,10 @@ class Recipe(models.Model):
     def calculate_difficulty(self):
         """
         Automatically determine difficulty based on cooking time
-        and number of ingredients.
+        and number of ingredients (stored in ``ingredient_count``).
         """
-        num_ingredients = (
-            len([i.strip() for i in self.ingredients.split(",") if i.strip()])
-            if self.ingredients else 0
-        )
-
-        if self.cooking_time == 0:
-            # No-cook recipes
-            self.difficulty = "easy" if num_ingredients < 4 else "medium"
-        elif self.cooking_time < 10:
-            self.difficulty = "easy" if num_ingredients < 4 else "medium"
-        elif self.cooking_time >= 10:
-            self.difficulty = "medium" if num_ingredients < 4 else "hard"
+        self.ingredient_count = count_ingredients(self.ingredients)
+        self.difficulty = difficulty_for(self.cooking_time, self.ingredient_count)
 
     def save(self, *args, **kwargs):
         """
@@ -107,4 +208,85 @@ class Recipe(models.Model):
         before saving to the database.
         """
         self.calculate_difficulty()
-        super().save(*args, **kwargs)
+        # One transaction for the row, its ingredient index and the
+        # statistics rollup updated by the post_save signal
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.sync_ingredient_index()
+
+    def sync_ingredient_index(self):
+        """
+        Rebuild this recipe's rows in the normalized ingredient index
+        from the free-text ``ingredients`` field.
+        """
+        names = normalize_ingredients(self.ingredients)
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name) for name in names], ignore_conflicts=True
+        )
+        wanted = set(
+            Ingredient.objects.filter(name__in=names).values_list("id", flat=True)
+        )
+        current = set(
+            RecipeIngredient.objects.filter(recipe=self)
+            .values_list("ingredient_id", flat=True)
+        )
+        if current - wanted:
+            RecipeIngredient.objects.filter(
+                recipe=self, ingredient_id__in=current - wanted
+            ).delete()
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(recipe=self, ingredient_id=ingredient_id)
+                for ingredient_id in wanted - current
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class RecipeIngredient(models.Model):
+    """Through-table linking a Recipe to each of its normalized ingredients."""
+
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ("recipe", "ingredient")
+        indexes = [
+            # Reverse lookup: ingredient -> recipes
+            models.Index(fields=["ingredient", "recipe"], name="recipe_ingr_ingr_recipe_idx"),
+        ]
+
+
+class RecipeStats(models.Model):
+    """
+    Catalogue-wide rollup: number of recipes per meal type, difficulty
+    and cooking-time band. Kept up to date incrementally by the Recipe
+    save/delete signals (see recipes/stats.py).
+    """
+
+    dimension = models.CharField(max_length=20)
+    value = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("dimension", "value")
+        verbose_name_plural = "Recipe stats"
+
+    def __str__(self):
+        return f"{self.dimension}={self.value}: {self.count}"
+
+
+class SlowQuery(models.Model):
+    """
+    One entry of the slow-query log (see recipe_app/slow_queries.py).
+    Each entry is a new row, so concurrent workers never overwrite one
+    another; the table is trimmed to SLOW_QUERY_LOG_SIZE when read.
+    """
+
+    entry = models.JSONField()
+
+    class Meta:
+        verbose_name_plural = "Slow queries"
+
+    def __str__(self):
+        return f"{self.entry.get('duration_ms')} ms: {self.entry.get('sql', '')[:80]}"
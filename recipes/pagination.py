@@ -0,0 +1,114 @@
+"""
+Keyset (seek) pagination for the recipe card listings.
+
+Pages are addressed by an opaque cursor holding the sort key values of
+the last row served, so fetching page N costs the same as page 1
+(no OFFSET). Listings render the next page's cards as a fragment when
+``?fragment=1`` is passed, which the infinite-scroll script appends.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import BadRequest, ValidationError
+from django.db.models import Q
+from django.shortcuts import render
+
+DEFAULT_PAGE_SIZE = 24
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, queryset, ordering):
+    """
+    Decode ``cursor`` into one value per ``ordering`` field, converted to
+    that field's type so a tampered cursor is a 400 rather than a 500.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise BadRequest("Invalid page cursor.")
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise BadRequest("Invalid page cursor.")
+    converted = []
+    for field, value in zip(ordering, values):
+        if value is None or isinstance(value, (list, dict)):
+            raise BadRequest("Invalid page cursor.")
+        # Annotations such as search_rank resolve as well as model fields
+        output_field = queryset.query.resolve_ref(field.lstrip("-")).output_field
+        try:
+            converted.append(output_field.to_python(value))
+        except ValidationError:
+            raise BadRequest("Invalid page cursor.")
+    return converted
+
+
+def seek_filter(ordering, values):
+    """
+    Build the WHERE clause selecting rows strictly after ``values`` for
+    the given ordering, e.g. ("-rank", "id") ->
+    rank < r OR (rank = r AND id > i).
+    """
+    condition = Q()
+    for position, field in enumerate(ordering):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        step = Q(**{f"{name}__{lookup}": values[position]})
+        for previous, value in zip(ordering[:position], values):
+            step &= Q(**{previous.lstrip("-"): value})
+        condition |= step
+    return condition
+
+
+class KeysetPage:
+    """One page of rows plus the query string that fetches the next one."""
+
+    def __init__(self, items, next_query=None):
+        self.items = items
+        self.next_query = next_query
+
+    @property
+    def has_next(self):
+        return self.next_query is not None
+
+
+def paginate_keyset(request, queryset, ordering, page_size=None):
+    """
+    Return a KeysetPage for ``queryset`` sorted on ``ordering``.
+    The last entry of ``ordering`` must be unique (normally "id").
+    """
+    page_size = page_size or getattr(settings, "RECIPES_PER_PAGE", DEFAULT_PAGE_SIZE)
+    queryset = queryset.order_by(*ordering)
+
+    cursor = request.GET.get("cursor")
+    if cursor:
+        queryset = queryset.filter(seek_filter(ordering, decode_cursor(cursor, queryset, ordering)))
+
+    # Fetch one extra row to know whether another page exists
+    items = list(queryset[: page_size + 1])
+    if len(items) <= page_size:
+        return KeysetPage(items)
+
+    items = items[:page_size]
+    last = items[-1]
+    params = request.GET.copy()
+    params.pop("fragment", None)
+    params["cursor"] = encode_cursor(
+        [getattr(last, field.lstrip("-")) for field in ordering]
+    )
+    return KeysetPage(items, params.urlencode())
+
+
+def render_card_page(request, template_name, fragment_template, context, page):
+    """
+    Render a full listing page, or only the next batch of cards when the
+    infinite-scroll script asks for a fragment.
+    """
+    context = {**context, "page": page}
+    if request.GET.get("fragment"):
+        return render(request, fragment_template, context)
+    return render(request, template_name, context)
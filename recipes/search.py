@@ -0,0 +1,204 @@
+"""
+Pluggable full-text search for the header search.
+
+The backend is picked from the database in use:
+
+- SQLite: an FTS5 virtual table (``recipes_recipe_fts``) keyed by recipe id.
+- Postgres: a ``search_vector`` tsvector column with a GIN index.
+- Anything else: a plain ``icontains`` fallback.
+
+Set ``RECIPE_SEARCH_BACKEND`` to a dotted class path to override the choice.
+Every backend's ``search()`` returns the queryset annotated with
+``search_rank`` and ordered by relevance, with name matches weighted
+above ingredient matches.
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import ingredient_match
+
+FTS_TABLE = "recipes_recipe_fts"
+
+# Relative weights of the two indexed columns
+NAME_WEIGHT = 10.0
+INGREDIENTS_WEIGHT = 1.0
+
+
+def query_terms(query):
+    """Split a user query into lower-cased word tokens."""
+    return re.findall(r"\w+", (query or "").lower())
+
+
+class BaseSearchBackend:
+    """Interface shared by all search backends."""
+
+    def index(self, recipe):
+        """Add or refresh a single recipe in the index."""
+
+    def index_many(self, recipes):
+        """Add a batch of newly created recipes (used by bulk imports)."""
+        for recipe in recipes:
+            self.index(recipe)
+
+    def remove(self, recipe_id):
+        """Drop a single recipe from the index."""
+
+    def rebuild(self):
+        """Re-index every recipe from scratch."""
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def no_matches(self, queryset):
+        """An empty result that still carries ``search_rank`` for ordering."""
+        return queryset.annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        ).none()
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Fallback for databases without a full-text engine."""
+
+    def search(self, queryset, query):
+        return (
+            queryset.filter(Q(name__icontains=query) | Q(ingredient_match(query)))
+            .annotate(
+                search_rank=Case(
+                    When(name__icontains=query, then=Value(NAME_WEIGHT)),
+                    default=Value(INGREDIENTS_WEIGHT),
+                    output_field=FloatField(),
+                )
+            )
+            .order_by("-search_rank", "id")
+        )
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """SQLite FTS5 virtual table, ranked with bm25()."""
+
+    def index(self, recipe):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [recipe.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, ingredients) VALUES (%s, %s, %s)",
+                [recipe.pk, recipe.name, recipe.ingredients],
+            )
+
+    def index_many(self, recipes):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, ingredients) VALUES (%s, %s, %s)",
+                [(recipe.pk, recipe.name, recipe.ingredients) for recipe in recipes],
+            )
+
+    def remove(self, recipe_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [recipe_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, ingredients) "
+                "SELECT id, name, ingredients FROM recipes_recipe"
+            )
+
+    def search(self, queryset, query):
+        terms = query_terms(query)
+        if not terms:
+            return self.no_matches(queryset)
+        # Prefix match on every term: "flo" finds "flour"
+        match = " ".join(f'"{term}"*' for term in terms)
+        # Join the FTS table so MATCH runs once and bm25() is computed per
+        # matching row in the same pass (a correlated subquery would re-run
+        # the full-text query for every row)
+        return (
+            queryset.extra(
+                tables=[FTS_TABLE],
+                where=[f"{FTS_TABLE}.rowid = recipes_recipe.id", f"{FTS_TABLE} MATCH %s"],
+                params=[match],
+            )
+            .annotate(
+                search_rank=RawSQL(
+                    f"-bm25({FTS_TABLE}, {NAME_WEIGHT}, {INGREDIENTS_WEIGHT})",
+                    (),
+                    output_field=FloatField(),
+                )
+            )
+            .order_by("-search_rank", "id")
+        )
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Postgres tsvector column (GIN indexed), ranked with ts_rank()."""
+
+    VECTOR_SQL = (
+        "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(ingredients, '')), 'B')"
+    )
+
+    def index(self, recipe):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE recipes_recipe SET search_vector = {self.VECTOR_SQL} WHERE id = %s",
+                [recipe.pk],
+            )
+
+    def index_many(self, recipes):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE recipes_recipe SET search_vector = {self.VECTOR_SQL} WHERE id = ANY(%s)",
+                [[recipe.pk for recipe in recipes]],
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE recipes_recipe SET search_vector = {self.VECTOR_SQL}")
+
+    def search(self, queryset, query):
+        terms = query_terms(query)
+        if not terms:
+            return self.no_matches(queryset)
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        # Match on the row itself (GIN index) rather than through an
+        # id IN (SELECT ...) over the same table; ts_rank() is then
+        # computed once per matching row
+        return (
+            queryset.extra(
+                where=["recipes_recipe.search_vector @@ to_tsquery('english', %s)"],
+                params=[tsquery],
+            )
+            .annotate(
+                search_rank=RawSQL(
+                    # Weights are ordered {D, C, B, A}
+                    f"ts_rank('{{0, 0, {INGREDIENTS_WEIGHT / NAME_WEIGHT}, 1}}', "
+                    "recipes_recipe.search_vector, to_tsquery('english', %s))",
+                    (tsquery,),
+                    output_field=FloatField(),
+                )
+            )
+            .order_by("-search_rank", "id")
+        )
+
+
+def fts5_table_exists():
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    """Return the configured (or auto-detected) search backend instance."""
+    path = getattr(settings, "RECIPE_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == "sqlite" and fts5_table_exists():
+        return SQLiteFTSBackend()
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+    return SimpleSearchBackend()
@@ -0,0 +1,54 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_catalogue_version, purge_recipe_pages
+from .models import Recipe
+from .search import get_search_backend
+from . import stats
+
+
+# Keep the full-text index in step with the recipe table
+@receiver(post_save, sender=Recipe)
+def index_recipe(sender, instance, **kwargs):
+    get_search_backend().index(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+
+
+# Any change to the catalogue invalidates version-keyed caches (charts, ...)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def bump_version(sender, **kwargs):
+    bump_catalogue_version()
+
+
+# Only this recipe's cached pages (see recipe_app/page_cache.py)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def purge_pages(sender, instance, **kwargs):
+    purge_recipe_pages(instance.pk)
+
+
+# Incremental maintenance of the RecipeStats rollup
+@receiver(pre_save, sender=Recipe)
+def remember_stats_values(sender, instance, **kwargs):
+    instance._stats_previous = None
+    if instance.pk and not instance._state.adding:
+        instance._stats_previous = (
+            Recipe.objects.filter(pk=instance.pk).values(*stats.STATS_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def update_stats_on_save(sender, instance, **kwargs):
+    new_values = {field: getattr(instance, field) for field in stats.STATS_FIELDS}
+    stats.record_change(getattr(instance, "_stats_previous", None), new_values)
+
+
+@receiver(post_delete, sender=Recipe)
+def update_stats_on_delete(sender, instance, **kwargs):
+    old_values = {field: getattr(instance, field) for field in stats.STATS_FIELDS}
+    stats.record_change(old_values, None)
@@ -0,0 +1,53 @@
+// Favourite buttons without a page reload.
+// Intercepts the card's add/remove form, POSTs the desired state to the
+// JSON toggle endpoint and flips the button in place. Without JS the form
+// still submits to the classic add/remove views.
+(function () {
+    function render(form, favourite) {
+        const button = form.querySelector("button");
+        const name = form.dataset.recipeName;
+        form.dataset.favourite = favourite ? "1" : "0";
+        form.action = favourite ? form.dataset.removeUrl : form.dataset.addUrl;
+        button.classList.toggle("btn-remove", favourite);
+        button.classList.toggle("btn-add", !favourite);
+        button.textContent = favourite ? "Remove from Favourites" : "♡ Add to Favourites";
+        button.setAttribute(
+            "aria-label",
+            favourite ? "Remove " + name + " from favourites" : "Add " + name + " to favourites"
+        );
+    }
+
+    document.addEventListener("submit", function (event) {
+        const form = event.target.closest("form.fav-form[data-toggle-url]");
+        if (!form) {
+            return;
+        }
+        event.preventDefault();
+        const button = form.querySelector("button");
+        const body = new FormData();
+        body.append("favourite", form.dataset.favourite === "1" ? "0" : "1");
+        button.disabled = true;
+        fetch(form.dataset.toggleUrl, {
+            method: "POST",
+            body: body,
+            credentials: "same-origin",
+            headers: { "X-CSRFToken": form.querySelector("[name=csrfmiddlewaretoken]").value },
+        })
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.status);
+                }
+                return response.json();
+            })
+            .then(function (data) {
+                render(form, data.favourite);
+            })
+            .catch(function () {
+                // Fall back to the classic form post
+                form.submit();
+            })
+            .finally(function () {
+                button.disabled = false;
+            });
+    });
+})();
@@ -0,0 +1,43 @@
+// Infinite scroll for recipe listings.
+// Replaces each "Load more" link with the next page of cards (fetched as an
+// HTML fragment) once it scrolls into view. Without JS the link still works
+// as a plain "next page" link.
+(function () {
+    function loadMore(link, observer) {
+        observer.unobserve(link);
+        fetch(link.dataset.fragmentUrl, { credentials: "same-origin" })
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.status);
+                }
+                return response.text();
+            })
+            .then(function (html) {
+                link.insertAdjacentHTML("beforebegin", html);
+                const container = link.parentNode;
+                link.remove();
+                watch(container, observer);
+            })
+            .catch(function () {
+                // Leave the link in place so the user can still click through
+            });
+    }
+
+    function watch(root, observer) {
+        root.querySelectorAll("a.load-more[data-fragment-url]").forEach(function (link) {
+            observer.observe(link);
+        });
+    }
+
+    if (!("IntersectionObserver" in window)) {
+        return;
+    }
+    const observer = new IntersectionObserver(function (entries) {
+        entries.forEach(function (entry) {
+            if (entry.isIntersecting) {
+                loadMore(entry.target, observer);
+            }
+        });
+    }, { rootMargin: "400px" });
+    watch(document, observer);
+})();
@@ -0,0 +1,130 @@
+"""
+Incrementally maintained catalogue statistics (the RecipeStats table).
+
+Each recipe counts once in three dimensions: its meal type, its
+difficulty and its cooking-time band. Saving or deleting a recipe moves
+those counts up or down inside the same transaction, so unfiltered
+analytics are a single small read instead of a scan of every recipe.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .analytics import COOKING_TIME_BANDS, cooking_time_band, recipe_analytics
+from .models import Recipe, RecipeStats
+
+STATS_FIELDS = ("meal_type", "difficulty", "cooking_time")
+
+
+def stats_keys(values):
+    """The (dimension, value) rows a recipe with these field values counts in."""
+    return [
+        ("meal_type", values["meal_type"]),
+        ("difficulty", values["difficulty"]),
+        ("cooking_time_band", cooking_time_band(values["cooking_time"])),
+    ]
+
+
+def apply_deltas(deltas):
+    """Add each delta in ``{(dimension, value): delta}`` to the rollup."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        RecipeStats.objects.bulk_create(
+            [RecipeStats(dimension=dimension, value=value) for dimension, value in deltas],
+            ignore_conflicts=True,
+        )
+        for (dimension, value), delta in deltas.items():
+            RecipeStats.objects.filter(dimension=dimension, value=value).update(
+                count=F("count") + delta
+            )
+
+
+def record_change(old_values, new_values):
+    """
+    Move a recipe's counts from ``old_values`` to ``new_values``; either
+    may be None for a created or deleted recipe.
+    """
+    deltas = Counter()
+    if old_values is not None:
+        deltas.subtract(stats_keys(old_values))
+    if new_values is not None:
+        deltas.update(stats_keys(new_values))
+    apply_deltas(deltas)
+
+
+def recipe_count():
+    """Number of recipes, read from the rollup (each counts under one meal type)."""
+    total = RecipeStats.objects.filter(dimension="meal_type").aggregate(total=Sum("count"))["total"]
+    return total or 0
+
+
+def expected_counts():
+    """Recompute every rollup row from the recipe table (GROUP BY queries)."""
+    analytics = recipe_analytics(Recipe.objects.all())
+    counts = {}
+    for value, total in analytics["meal_types"].items():
+        counts[("meal_type", value)] = total
+    for value, total in analytics["difficulties"].items():
+        counts[("difficulty", value)] = total
+    for band in analytics["cooking_time"]:
+        if band["count"]:
+            counts[("cooking_time_band", band["band"])] = band["count"]
+    return counts
+
+
+def stored_counts():
+    return {
+        (row.dimension, row.value): row.count
+        for row in RecipeStats.objects.exclude(count=0)
+    }
+
+
+def rebuild():
+    """Replace the rollup with counts recomputed from scratch."""
+    counts = expected_counts()
+    with transaction.atomic():
+        RecipeStats.objects.all().delete()
+        RecipeStats.objects.bulk_create(
+            [
+                RecipeStats(dimension=dimension, value=value, count=count)
+                for (dimension, value), count in counts.items()
+            ]
+        )
+    return counts
+
+
+def verify():
+    """
+    Compare the rollup with a fresh recount.
+    Returns {(dimension, value): (stored, expected)} for every mismatch.
+    """
+    expected, stored = expected_counts(), stored_counts()
+    return {
+        key: (stored.get(key, 0), expected.get(key, 0))
+        for key in expected.keys() | stored.keys()
+        if stored.get(key, 0) != expected.get(key, 0)
+    }
+
+
+def catalogue_analytics():
+    """Unfiltered analytics (same shape as recipe_analytics) read from the rollup."""
+    meal_types, difficulties, bands = {}, {}, {}
+    for row in RecipeStats.objects.exclude(count=0).order_by("-count", "value"):
+        if row.dimension == "meal_type":
+            meal_types[row.value] = row.count
+        elif row.dimension == "difficulty":
+            difficulties[row.value] = row.count
+        elif row.dimension == "cooking_time_band":
+            bands[row.value] = row.count
+    return {
+        "count": sum(meal_types.values()),
+        "meal_types": meal_types,
+        "difficulties": difficulties,
+        "cooking_time": [
+            {"band": label, "count": bands.get(label, 0)}
+            for label, _, _ in COOKING_TIME_BANDS
+        ],
+    }
@@ -0,0 +1,47 @@
+from django import template
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from recipes.cache import card_cache
+from recipes.images import manifest_generation
+
+register = template.Library()
+
+CARD_TEMPLATE = "recipes/recipe_card.html"
+# Marks the boundaries of the favourite button states in CARD_TEMPLATE
+SLOT = "<!--favourite-slot-->"
+CSRF_PLACEHOLDER = "__csrf_token__"
+
+
+def card_parts(recipe):
+    """
+    The user-independent HTML of a recipe card, split around the
+    favourite button: (before, remove_form, add_form, login_link, after).
+    Cached per recipe id and updated_at (and thumbnail manifest).
+    """
+    key = (recipe.pk, recipe.updated_at, manifest_generation())
+    parts = card_cache.get(key)
+    if parts is None:
+        html = render_to_string(
+            CARD_TEMPLATE,
+            {"recipe": recipe, "slot": mark_safe(SLOT), "csrf_token": CSRF_PLACEHOLDER},
+        )
+        parts = tuple(html.split(SLOT))
+        card_cache.set(key, parts)
+    return parts
+
+
+@register.simple_tag(takes_context=True)
+def recipe_card(context, recipe):
+    """
+    Render a recipe card: the cached fragment plus the current user's
+    favourite button (``fav_ids`` from the context).
+    """
+    before, remove_form, add_form, login_link, after = card_parts(recipe)
+    user = context.get("user")
+    if user is not None and user.is_authenticated:
+        button = remove_form if recipe.pk in context.get("fav_ids", ()) else add_form
+        button = button.replace(CSRF_PLACEHOLDER, str(context.get("csrf_token", "")))
+    else:
+        button = login_link
+    return mark_safe(before + button + after)
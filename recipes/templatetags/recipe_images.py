@@ -0,0 +1,41 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from recipes.images import renditions_for
+
+register = template.Library()
+
+# How wide each rendition is displayed, for the browser's srcset choice
+SIZES = {
+    "card": "(max-width: 600px) 100vw, 320px",
+    "detail": "(max-width: 900px) 100vw, 800px",
+}
+
+
+def srcset(files):
+    return ", ".join(f"{static(item['path'])} {item['width']}w" for item in files)
+
+
+@register.simple_tag
+def recipe_picture(recipe, rendition="card", css_class="recipe-detail-image"):
+    """
+    Responsive <picture> for a recipe image: WebP and JPEG thumbnails
+    with srcset, or the original static file if none were built.
+    """
+    variants = renditions_for(recipe.pic, rendition)
+    if not variants:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy">',
+            static(recipe.pic), recipe.name, css_class,
+        )
+    jpeg = variants["jpeg"]
+    sources = format_html_join(
+        "", '<source type="image/{}" srcset="{}" sizes="{}">',
+        ((fmt, srcset(files), SIZES[rendition]) for fmt, files in variants.items() if fmt != "jpeg"),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" alt="{}" class="{}" loading="lazy"></picture>',
+        sources, static(jpeg[0]["path"]), srcset(jpeg), SIZES[rendition],
+        jpeg[0]["width"], recipe.name, css_class,
+    )
@@ -1,8 +1,37 @@
-from django.test import TestCase
+import importlib
+import json
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from io import StringIO
+import sys
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError
+from django.test import LiveServerTestCase, TestCase, override_settings
 from django.urls import reverse
-from .models import Recipe
+from .models import Recipe, Ingredient, RecipeIngredient, RecipeStats, SlowQuery
+from . import stats
+from .search import SimpleSearchBackend, get_search_backend
+from .cache import LRUCache, card_cache, chart_cache, chart_cache_key
+from . import chart_pool
+from .chart_pool import LINE_CHART_MAX_POINTS, chart_payloads, render_charts
+from . import views
+from .pagination import encode_cursor
 from .forms import RecipeForm, RecipeSearchForm, AdvancedSearchForm
 
+# For the features that need a cache shared by every process (SHARED_CACHE,
+# Redis in production): in the single test process a local cache is shared
+shared_cache = override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    SHARED_CACHE=True,
+)
+
 
 # ----------------- Views -----------------
 
@@ -106,6 +135,1107 @@ class DifficultyCalculationTest(TestCase):
         self.assertIn("None listed", str(recipe))
 
 
+class RecomputeDifficultyCommandTest(TestCase):
+    def setUp(self):
+        self.toast = Recipe.objects.create(name="Toast", ingredients="Bread, Butter, Jam", cooking_time=5)
+        self.stew = Recipe.objects.create(name="Stew", ingredients="Beef, Carrot", cooking_time=90)
+
+    def test_ingredient_count_is_stored(self):
+        self.assertEqual(self.toast.ingredient_count, 3)
+        self.assertEqual(Recipe.objects.get(pk=self.stew.pk).ingredient_count, 2)
+
+    def test_dry_run_reports_without_writing(self):
+        with mock.patch("recipes.models.MANY_INGREDIENTS", 3):
+            out = StringIO()
+            call_command("recompute_difficulty", dry_run=True, stdout=out)
+        self.assertIn("easy -> medium: 1", out.getvalue())
+        self.assertIn("1 recipes would change", out.getvalue())
+        self.assertEqual(Recipe.objects.get(pk=self.toast.pk).difficulty, "easy")
+
+    def test_rule_change_updates_catalogue_and_stats(self):
+        with mock.patch("recipes.models.MANY_INGREDIENTS", 2):
+            call_command("recompute_difficulty", stdout=StringIO())
+        self.assertEqual(Recipe.objects.get(pk=self.toast.pk).difficulty, "medium")
+        self.assertEqual(Recipe.objects.get(pk=self.stew.pk).difficulty, "hard")
+        self.assertEqual(stats.verify(), {})
+
+    def test_recount_fixes_stale_counts(self):
+        Recipe.objects.update(ingredient_count=0)
+        call_command("recompute_difficulty", recount=True, stdout=StringIO())
+        self.assertEqual(Recipe.objects.get(pk=self.toast.pk).ingredient_count, 3)
+        self.assertEqual(Recipe.objects.get(pk=self.toast.pk).difficulty, "easy")
+
+
+# ----------------- Ingredient index -----------------
+
+class IngredientIndexTest(TestCase):
+    def setUp(self):
+        self.recipe = Recipe.objects.create(
+            name="Pancakes", ingredients="Flour, Eggs , Milk, flour", cooking_time=5
+        )
+
+    def test_index_populated_on_save(self):
+        names = set(self.recipe.ingredient_index.values_list("name", flat=True))
+        self.assertEqual(names, {"flour", "eggs", "milk"})
+
+    def test_index_updated_on_edit(self):
+        self.recipe.ingredients = "Flour, Butter"
+        self.recipe.save()
+        names = set(self.recipe.ingredient_index.values_list("name", flat=True))
+        self.assertEqual(names, {"flour", "butter"})
+        # Shared ingredient rows are reused, not duplicated
+        self.assertEqual(Ingredient.objects.filter(name="flour").count(), 1)
+        self.assertEqual(RecipeIngredient.objects.filter(recipe=self.recipe).count(), 2)
+
+    def test_with_ingredient_matches_substring(self):
+        Recipe.objects.create(name="Toast", ingredients="Wholemeal bread", cooking_time=2)
+        self.assertQuerySetEqual(
+            Recipe.objects.with_ingredient("FLOU"), [self.recipe]
+        )
+        self.assertEqual(Recipe.objects.with_ingredient("bread").get().name, "Toast")
+
+    def test_advanced_search_ingredient_filter(self):
+        Recipe.objects.create(name="Toast", ingredients="Bread", cooking_time=2)
+        response = self.client.get(reverse("recipes:advanced_search"), {"ingredient": "milk"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["name"] for r in response.context["recipes"]], ["Pancakes"])
+
+
+# ----------------- Full-text search -----------------
+
+class SearchBackendTest(TestCase):
+    def setUp(self):
+        self.by_name = Recipe.objects.create(
+            name="Banana Bread", ingredients="Flour, Eggs", cooking_time=40
+        )
+        self.by_ingredient = Recipe.objects.create(
+            name="Smoothie", ingredients="Banana, Milk", cooking_time=0
+        )
+        Recipe.objects.create(name="Toast", ingredients="Bread", cooking_time=2)
+
+    def test_default_backend_uses_fts5(self):
+        self.assertEqual(type(get_search_backend()).__name__, "SQLiteFTSBackend")
+
+    def test_name_matches_rank_first(self):
+        results = list(get_search_backend().search(Recipe.objects.all(), "banana"))
+        self.assertEqual(results, [self.by_name, self.by_ingredient])
+
+    def test_prefix_match(self):
+        results = get_search_backend().search(Recipe.objects.all(), "smoo")
+        self.assertEqual(list(results), [self.by_ingredient])
+
+    def test_index_follows_save_and_delete(self):
+        backend = get_search_backend()
+        self.by_ingredient.ingredients = "Mango, Milk"
+        self.by_ingredient.save()
+        self.assertEqual(list(backend.search(Recipe.objects.all(), "banana")), [self.by_name])
+        self.by_name.delete()
+        self.assertFalse(backend.search(Recipe.objects.all(), "banana").exists())
+
+    def test_full_text_query_runs_once(self):
+        # Ranking must not re-run MATCH per row in a correlated subquery
+        results = get_search_backend().search(Recipe.objects.filter(cooking_time__gt=0), "banana")
+        self.assertEqual(str(results.query).count("MATCH"), 1)
+        self.assertEqual(list(results), [self.by_name])
+
+    def test_simple_backend_ranking(self):
+        results = list(SimpleSearchBackend().search(Recipe.objects.all(), "banana"))
+        self.assertEqual(results, [self.by_name, self.by_ingredient])
+
+    def test_every_backend_annotates_rank_without_terms(self):
+        for backend in (get_search_backend(), SimpleSearchBackend()):
+            results = backend.search(Recipe.objects.all(), "!!!").order_by("-search_rank", "id")
+            self.assertEqual(list(results), [])
+
+    def test_migration_skips_index_without_fts5(self):
+        migration = importlib.import_module("recipes.migrations.0007_recipe_search_index")
+        schema_editor = mock.Mock()
+        schema_editor.connection.vendor = "sqlite"
+        schema_editor.connection.alias = "default"
+        schema_editor.execute.side_effect = OperationalError("no such module: fts5")
+        migration.create_search_index(None, schema_editor)
+        schema_editor.execute.assert_called_once()
+
+    def test_header_search_uses_ranking(self):
+        response = self.client.get(reverse("recipes:search_recipes"), {"q": "banana"})
+        self.assertEqual(list(response.context["recipes"]), [self.by_name, self.by_ingredient])
+
+    def test_header_search_without_terms(self):
+        for query in ["!!!", '"', " "]:
+            response = self.client.get(reverse("recipes:search_recipes"), {"q": query})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(list(response.context["recipes"]), [])
+
+
+# ----------------- Keyset pagination -----------------
+
+@override_settings(RECIPES_PER_PAGE=2)
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        User.objects.create_user(username="tester", password="secret")
+        self.client.login(username="tester", password="secret")
+        for name in ["Eggs", "Apple Pie", "Chips", "Banana Bread", "Dumplings"]:
+            Recipe.objects.create(name=name, ingredients="Flour", cooking_time=5)
+
+    def collect_pages(self, url, params):
+        names, response = [], self.client.get(url, params)
+        names += [r.name for r in response.context["recipes"]]
+        while response.context["page"].has_next:
+            response = self.client.get(f"{url}?{response.context['page'].next_query}&fragment=1")
+            names += [r.name for r in response.context["recipes"]]
+        return names, response
+
+    def test_list_pages_follow_name_order(self):
+        names, last = self.collect_pages(reverse("recipes:recipe_list"), {})
+        self.assertEqual(names, ["Apple Pie", "Banana Bread", "Chips", "Dumplings", "Eggs"])
+        self.assertTemplateUsed(last, "recipes/recipe_cards.html")
+        self.assertTemplateNotUsed(last, "recipes/main.html")
+
+    def test_first_page_links_to_next(self):
+        response = self.client.get(reverse("recipes:recipe_list"))
+        self.assertEqual(len(response.context["recipes"]), 2)
+        self.assertContains(response, "load-more")
+
+    def test_search_pages_keep_rank_order(self):
+        Recipe.objects.create(name="Flour Tortilla", ingredients="Water", cooking_time=5)
+        names, _ = self.collect_pages(reverse("recipes:search_recipes"), {"q": "flour"})
+        self.assertEqual(names[0], "Flour Tortilla")
+        self.assertEqual(len(names), 6)
+        self.assertEqual(len(set(names)), 6)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse("recipes:recipe_list"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_values_must_match_the_ordering(self):
+        cases = [
+            ("recipes:recipe_list", {}, ["x", "abc"]),
+            ("recipes:recipe_list", {}, [None, None]),
+            ("recipes:recipe_list", {}, ["x", [1]]),
+            ("recipes:search_recipes", {"q": "flour"}, ["abc", 1]),
+            ("recipes:search_recipes", {"q": "flour"}, [1.5, None]),
+            ("users:user_favourites", {}, ["abc"]),
+            ("users:my_recipes", {}, [None]),
+        ]
+        for url_name, params, values in cases:
+            with self.subTest(url_name, values=values):
+                response = self.client.get(
+                    reverse(url_name), {**params, "cursor": encode_cursor(values)}
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_huge_id_in_cursor(self):
+        response = self.client.get(
+            reverse("recipes:recipe_list"), {"cursor": encode_cursor(["x", 10**30])}
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+# ----------------- Chart cache -----------------
+
+class ChartCacheTest(TestCase):
+    def setUp(self):
+        chart_cache.clear()
+        self.recipe = Recipe.objects.create(name="Pancakes", ingredients="Flour, Eggs", cooking_time=5)
+
+    def test_lru_evicts_by_size(self):
+        lru = LRUCache(max_bytes=10)
+        lru.set("a", "xxxx")
+        lru.set("b", "xxxx")
+        lru.get("a")  # "b" is now least recently used
+        lru.set("c", "xxxx")
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual(lru.get("a"), "xxxx")
+        self.assertEqual(lru.current_bytes, 8)
+
+    def test_key_is_normalized(self):
+        self.assertEqual(
+            chart_cache_key({"name": " Cake ", "ingredient": "", "max_cooking_time": None}),
+            chart_cache_key({"name": "cake"}),
+        )
+
+    def test_repeat_search_skips_rendering(self):
+        url = reverse("recipes:advanced_search")
+        with mock.patch.object(views, "render_charts", wraps=views.render_charts) as render_charts:
+            first = self.client.get(url, {"name": "pan"})
+            second = self.client.get(url, {"name": "PAN "})
+        self.assertEqual(render_charts.call_count, 1)
+        self.assertEqual(first.context["chart_bar"], second.context["chart_bar"])
+
+    def test_recipe_save_invalidates(self):
+        url = reverse("recipes:advanced_search")
+        with mock.patch.object(views, "render_charts", wraps=views.render_charts) as render_charts:
+            self.client.get(url, {"name": "pan"})
+            self.recipe.cooking_time = 20
+            self.recipe.save()
+            self.client.get(url, {"name": "pan"})
+        self.assertEqual(render_charts.call_count, 2)
+
+
+# ----------------- Chart pool -----------------
+
+class ChartPoolTest(TestCase):
+    rows = [
+        {"name": "Pancakes", "meal_type": "breakfast", "cooking_time": 5, "difficulty": "easy"},
+        {"name": "Stew", "meal_type": "dinner", "cooking_time": 90, "difficulty": "hard"},
+    ]
+
+    def setUp(self):
+        chart_cache.clear()
+
+    @override_settings(RECIPE_CHART_WORKERS=2, RECIPE_CHART_TIMEOUT=60)
+    def test_pool_renders_all_charts(self):
+        charts = render_charts(self.rows)
+        self.assertEqual(len(charts), 3)
+        for chart in charts:
+            self.assertTrue(chart.startswith("iVBORw0KGgo"))  # base64 PNG header
+
+    @override_settings(RECIPE_CHART_WORKERS=0)
+    def test_inline_rendering(self):
+        self.assertTrue(all(render_charts(self.rows)))
+
+    @override_settings(RECIPE_CHART_WORKERS=0)
+    def test_only_requested_kinds_render(self):
+        self.assertEqual(render_charts(self.rows, kinds=["pie"])[::2], (None, None))
+
+    def test_payloads_are_aggregated(self):
+        rows = [
+            {"name": f"R{i}", "meal_type": "dinner", "cooking_time": 1000 - i, "difficulty": "easy"}
+            for i in range(1000)
+        ]
+        payloads = chart_payloads(rows)
+        self.assertEqual(payloads["bar"], [("dinner", 1000)])
+        self.assertEqual(payloads["pie"], [("easy", 1000)])
+        line = payloads["line"]
+        self.assertEqual(len(line), LINE_CHART_MAX_POINTS)
+        self.assertEqual((line[0], line[-1]), (("R999", 1), ("R0", 1000)))
+
+    def test_timeout_shows_placeholder(self):
+        Recipe.objects.create(name="Pancakes", ingredients="Flour", cooking_time=5)
+        url = reverse("recipes:advanced_search")
+        with mock.patch.object(views, "render_charts", return_value=("a", None, None)) as render:
+            response = self.client.get(url, {"name": "pan"})
+            self.assertContains(response, "Chart unavailable", count=2)
+            # Partial results are cached, so the next search doesn't wait again
+            self.client.get(url, {"name": "pan"})
+            self.assertEqual(render.call_count, 1)
+            # Once the retry time has passed, only the missing charts render
+            with mock.patch.object(views, "CHART_RETRY_SECONDS", 0):
+                chart_cache.clear()
+                self.client.get(url, {"name": "pan"})
+                self.client.get(url, {"name": "pan"})
+        self.assertEqual(render.call_args.kwargs["kinds"], ["pie", "line"])
+
+    @override_settings(RECIPE_CHART_WORKERS=1, RECIPE_CHART_TIMEOUT=0)
+    def test_timeout_replaces_the_pool(self):
+        executor = chart_pool.get_executor()
+        self.addCleanup(chart_pool.shutdown_executor)
+        self.assertEqual(render_charts(self.rows), (None, None, None))
+        self.assertIsNot(chart_pool.get_executor(), executor)
+
+    @override_settings(RECIPE_CHART_WORKERS=1)
+    def test_broken_stale_pool_leaves_the_new_one(self):
+        current = chart_pool.get_executor()
+        self.addCleanup(chart_pool.shutdown_executor)
+        stale = mock.Mock()
+        stale.submit.side_effect = BrokenProcessPool()
+        with mock.patch.object(chart_pool, "get_executor", return_value=stale):
+            self.assertEqual(render_charts(self.rows), (None, None, None))
+        stale.shutdown.assert_called_once()
+        self.assertIs(chart_pool.get_executor(), current)
+
+
+# ----------------- Advanced search pipeline -----------------
+
+@shared_cache
+class AdvancedSearchQueriesTest(TestCase):
+    def setUp(self):
+        chart_cache.clear()
+        for i in range(5):
+            Recipe.objects.create(name=f"Pie {i}", ingredients="Flour, Apple", cooking_time=10 * i)
+
+    def test_single_query_per_request(self):
+        url = reverse("recipes:advanced_search")
+        for params in ({}, {"name": "pie", "ingredient": "apple", "max_cooking_time": 30}):
+            with mock.patch.object(views, "render_charts", return_value=("a", "b", "c")):
+                with self.assertNumQueries(1):
+                    response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+
+    def test_results_table(self):
+        response = self.client.get(
+            reverse("recipes:advanced_search"), {"max_cooking_time": 10}
+        )
+        self.assertEqual(len(response.context["recipes"]), 2)
+        self.assertContains(response, reverse("recipes:recipe_detail", args=[Recipe.objects.get(name="Pie 1").id]))
+
+
+# ----------------- Analytics endpoint -----------------
+
+class AdvancedSearchAnalyticsTest(TestCase):
+    def setUp(self):
+        Recipe.objects.create(name="Salad", ingredients="Lettuce", cooking_time=0, meal_type="lunch")
+        Recipe.objects.create(name="Eggs", ingredients="Eggs", cooking_time=5, meal_type="breakfast")
+        Recipe.objects.create(name="Roast", ingredients="Beef, Potato, Carrot, Salt", cooking_time=90)
+        Recipe.objects.create(name="Pasta", ingredients="Pasta, Salt", cooking_time=12)
+
+    def test_unfiltered_counts(self):
+        url = reverse("recipes:advanced_search_analytics")
+        with self.assertNumQueries(1):  # read from the RecipeStats rollup
+            data = self.client.get(url).json()
+        self.assertEqual(data["count"], 4)
+        self.assertEqual(data["meal_types"], {"dinner": 2, "breakfast": 1, "lunch": 1})
+        self.assertEqual(data["difficulties"], {"easy": 2, "hard": 1, "medium": 1})
+        self.assertEqual(
+            data["cooking_time"],
+            [
+                {"band": "no-cook", "count": 1},
+                {"band": "under-10", "count": 1},
+                {"band": "10-29", "count": 1},
+                {"band": "30-59", "count": 0},
+                {"band": "60+", "count": 1},
+            ],
+        )
+
+    def test_uses_search_filters(self):
+        data = self.client.get(
+            reverse("recipes:advanced_search_analytics"), {"ingredient": "salt"}
+        ).json()
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["meal_types"], {"dinner": 2})
+
+    def test_filtered_counts_use_group_by(self):
+        url = reverse("recipes:advanced_search_analytics")
+        with self.assertNumQueries(3):
+            data = self.client.get(url, {"meal_type": "dinner"}).json()
+        self.assertEqual(data["count"], 2)
+
+    def test_invalid_filters(self):
+        response = self.client.get(
+            reverse("recipes:advanced_search_analytics"), {"max_cooking_time": "soon"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+# ----------------- Statistics rollup -----------------
+
+class RecipeStatsTest(TestCase):
+    def setUp(self):
+        self.soup = Recipe.objects.create(name="Soup", ingredients="Water", cooking_time=15, meal_type="lunch")
+        Recipe.objects.create(name="Toast", ingredients="Bread", cooking_time=2, meal_type="breakfast")
+
+    def count(self, dimension, value):
+        row = RecipeStats.objects.filter(dimension=dimension, value=value).first()
+        return row.count if row else 0
+
+    def test_counts_follow_create_update_delete(self):
+        self.assertEqual(self.count("meal_type", "lunch"), 1)
+        self.assertEqual(self.count("cooking_time_band", "10-29"), 1)
+
+        self.soup.meal_type = "dinner"
+        self.soup.cooking_time = 45
+        self.soup.save()
+        self.assertEqual(self.count("meal_type", "lunch"), 0)
+        self.assertEqual(self.count("meal_type", "dinner"), 1)
+        self.assertEqual(self.count("cooking_time_band", "30-59"), 1)
+
+        self.soup.delete()
+        self.assertEqual(self.count("meal_type", "dinner"), 0)
+        self.assertEqual(stats.verify(), {})
+
+    def test_rollup_matches_filtered_analytics(self):
+        with self.assertNumQueries(1):
+            from_rollup = stats.catalogue_analytics()
+        self.assertEqual(
+            from_rollup, self.client.get(reverse("recipes:advanced_search_analytics")).json()
+        )
+        self.assertEqual(from_rollup["count"], 2)
+
+    def test_rebuild_command_repairs_drift(self):
+        RecipeStats.objects.filter(dimension="meal_type").update(count=99)
+        self.assertTrue(stats.verify())
+        call_command("rebuild_recipe_stats", stdout=StringIO())
+        self.assertEqual(stats.verify(), {})
+
+
+# ----------------- Thumbnails -----------------
+
+class ThumbnailPipelineTest(TestCase):
+    def setUp(self):
+        from PIL import Image
+
+        self.static_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.static_dir)
+        (self.static_dir / "recipes").mkdir()
+        Image.new("RGB", (1000, 500), "orange").save(self.static_dir / "recipes" / "soup.jpg")
+        settings_override = override_settings(
+            STATICFILES_DIRS=[self.static_dir],
+            RECIPE_THUMBNAIL_ROOT=self.static_dir / "thumbnails",
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.recipe = Recipe.objects.create(
+            name="Soup", ingredients="Water", cooking_time=15, pic="recipes/soup.jpg"
+        )
+
+    def test_command_builds_hashed_thumbnails(self):
+        call_command("build_thumbnails", stdout=StringIO())
+        names = sorted(p.name for p in (self.static_dir / "thumbnails").glob("soup.*"))
+        # card 320/640 and detail 800/1000 (never upscaled), in WebP and JPEG
+        self.assertEqual(len(names), 8)
+        self.assertIn("soup.", names[0])
+        self.assertTrue(any(name.endswith(".640w.webp") for name in names))
+        self.assertTrue(any(name.endswith(".1000w.jpg") for name in names))
+
+    def test_card_uses_srcset(self):
+        response = self.client.get(reverse("recipes:search_recipes"))
+        self.assertContains(response, 'src="/static/recipes/soup.jpg"')
+
+        call_command("build_thumbnails", stdout=StringIO())
+        response = self.client.get(reverse("recipes:search_recipes"))
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, "640w")
+        self.assertNotContains(response, 'src="/static/recipes/soup.jpg"')
+
+
+# ----------------- Bulk import -----------------
+
+class ImportRecipesCommandTest(TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def test_csv_import_matches_save_and_rejects_bad_rows(self):
+        path = self.tmp / "feed.csv"
+        path.write_text(
+            "name,ingredients,cooking_time,meal_type\n"
+            "Toast,\"Bread, Butter\",5,breakfast\n"
+            "Stew,\"Beef, Carrot, Onion, Stock\",90,dinner\n"
+            ",Nothing,5,dinner\n"
+            "Salad,\"Lettuce, Tomato\",ten,lunch\n",
+            encoding="utf-8",
+        )
+        out = StringIO()
+        call_command("import_recipes", str(path), batch_size=1, stdout=out)
+
+        self.assertIn("Imported 2 recipes", out.getvalue())
+        self.assertIn("rows/s", out.getvalue())
+        self.assertEqual(Recipe.objects.get(name="Toast").difficulty, "easy")
+        self.assertEqual(Recipe.objects.get(name="Stew").difficulty, "hard")
+        self.assertEqual(
+            set(Recipe.objects.with_ingredient("carrot").values_list("name", flat=True)), {"Stew"}
+        )
+        self.assertEqual(stats.verify(), {})
+
+        rejects = (self.tmp / "feed.csv.rejects.jsonl").read_text().splitlines()
+        self.assertEqual(len(rejects), 2)
+        self.assertIn("name is required", rejects[0])
+        self.assertIn("cooking_time", rejects[1])
+
+    def test_jsonl_import_is_searchable(self):
+        path = self.tmp / "feed.jsonl"
+        path.write_text(
+            '{"name": "Omelette", "ingredients": "Eggs, Cheese", "cooking_time": 8}\n'
+            "not json\n",
+            encoding="utf-8",
+        )
+        rejects = self.tmp / "bad.jsonl"
+        call_command("import_recipes", str(path), rejects=str(rejects), stdout=StringIO())
+
+        results = get_search_backend().search(Recipe.objects.all(), "omelette")
+        self.assertEqual([r.name for r in results], ["Omelette"])
+        self.assertIn("invalid JSON", rejects.read_text())
+
+    def test_rejects_non_text_and_huge_values(self):
+        from .importer import RowError, recipe_from_row
+
+        for row, message in [
+            ({"name": 42, "ingredients": "Eggs", "cooking_time": 5}, "name must be text"),
+            ({"name": "Eggs", "ingredients": ["Eggs"], "cooking_time": 5}, "ingredients must be text"),
+            ({"name": "Eggs", "ingredients": "Eggs", "cooking_time": 5, "meal_type": {}},
+             "meal_type must be text"),
+            ({"name": "Eggs", "ingredients": "Eggs", "cooking_time": 10**12}, "cooking_time cannot be more"),
+            ({"name": "Eggs", "ingredients": "Eggs", "cooking_time": 5, "prep_time": "99999"},
+             "prep_time cannot be more"),
+        ]:
+            with self.subTest(message), self.assertRaisesMessage(RowError, message):
+                recipe_from_row(row)
+
+    def test_batch_difficulties_match_model_rule(self):
+        from .importer import batch_difficulties
+
+        cases = [(0, 1), (9, 3), (9, 4), (10, 3), (10, 4), (45, 8)]
+        expected = []
+        for cooking_time, count in cases:
+            recipe = Recipe(cooking_time=cooking_time, ingredients=", ".join(["x"] * count))
+            recipe.calculate_difficulty()
+            expected.append(recipe.difficulty)
+        self.assertEqual(batch_difficulties(*zip(*cases)), expected)
+
+
+# ----------------- Export -----------------
+
+class SearchExportTest(TestCase):
+    def setUp(self):
+        Recipe.objects.create(name="Toast", ingredients="Bread, Butter", cooking_time=5,
+                              meal_type="breakfast")
+        Recipe.objects.create(name="Stew, Irish", ingredients="Beef, Carrot", cooking_time=90)
+
+    def read(self, response):
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_advanced_search_csv(self):
+        response = self.client.get(reverse("recipes:advanced_search"), {"format": "csv"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="advanced_search.csv"', response["Content-Disposition"])
+        lines = self.read(response).splitlines()
+        self.assertEqual(lines[0], "id,name,meal_type,difficulty,prep_time,cooking_time,ingredients")
+        self.assertEqual(len(lines), 3)
+        self.assertIn('"Stew, Irish"', lines[2])
+
+    def test_header_search_jsonl_applies_filters(self):
+        response = self.client.get(
+            reverse("recipes:search_recipes"), {"q": "bread", "format": "jsonl"}
+        )
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row["name"] for row in rows], ["Toast"])
+        self.assertEqual(rows[0]["difficulty"], "easy")
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(reverse("recipes:advanced_search"), {"format": "xml"})
+        self.assertEqual(response.status_code, 400)
+
+
+# ----------------- Conditional GET -----------------
+
+# Revalidation in the views themselves, under the anonymous page cache
+@override_settings(PAGE_CACHE_SECONDS=0)
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.recipe = Recipe.objects.create(name="Toast", ingredients="Bread", cooking_time=5)
+        self.detail_url = reverse("recipes:recipe_detail", args=[self.recipe.pk])
+
+    def test_detail_revalidates_until_recipe_changes(self):
+        response = self.client.get(self.detail_url)
+        etag = response["ETag"]
+        self.assertFalse(etag.startswith("W/"))
+        self.assertIn("Last-Modified", response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.recipe.cooking_time = 20
+        self.recipe.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_detail_etag_depends_on_login(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        user = User.objects.create_user(username="cook", password="pw")
+        self.client.force_login(user)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_revalidates_until_catalogue_or_favourites_change(self):
+        user = User.objects.create_user(username="cook", password="pw")
+        self.client.force_login(user)
+        url = reverse("recipes:recipe_list")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.post(reverse("users:toggle_favourite", args=[self.recipe.pk]))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        soup = Recipe.objects.create(name="Soup", ingredients="Water", cooking_time=15)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        soup.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_etag_does_not_depend_on_the_cache(self):
+        # Another worker, with nothing cached yet, must agree on the ETag
+        self.client.force_login(User.objects.create_user(username="cook", password="pw"))
+        url = reverse("recipes:recipe_list")
+        etag = self.client.get(url)["ETag"]
+        cache.clear()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    @shared_cache
+    def test_list_etag_from_the_shared_cache(self):
+        user = User.objects.create_user(username="cook", password="pw")
+        self.client.force_login(user)
+        url = reverse("recipes:recipe_list")
+        etag = self.client.get(url)["ETag"]
+        # session + user only: both versions come from the cache
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.client.post(reverse("users:toggle_favourite", args=[self.recipe.pk]))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_still_requires_login(self):
+        response = self.client.get(reverse("recipes:recipe_list"), HTTP_IF_NONE_MATCH='"x"')
+        self.assertEqual(response.status_code, 302)
+
+
+# ----------------- Anonymous page cache -----------------
+
+@shared_cache
+class PageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.recipe = Recipe.objects.create(name="Toast", ingredients="Bread", cooking_time=5)
+        self.other = Recipe.objects.create(name="Soup", ingredients="Water", cooking_time=15)
+        self.url = reverse("recipes:recipe_detail", args=[self.recipe.pk])
+        self.other_url = reverse("recipes:recipe_detail", args=[self.other.pk])
+
+    def test_second_anonymous_visit_is_served_from_cache(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Page-Cache"], "miss")
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertContains(response, "Toast")
+        self.assertEqual(self.client.get(reverse("about"))["X-Page-Cache"], "miss")
+        self.assertEqual(self.client.get(reverse("about"))["X-Page-Cache"], "hit")
+
+    def test_cached_page_revalidates(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_saving_a_recipe_purges_only_its_pages(self):
+        self.client.get(self.url)
+        self.client.get(self.other_url)
+        self.recipe.name = "Cheese toast"
+        self.recipe.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Page-Cache"], "miss")
+        self.assertContains(response, "Cheese toast")
+        self.assertEqual(self.client.get(self.other_url)["X-Page-Cache"], "hit")
+
+        self.recipe.delete()
+        with self.assertLogs("django.request", "WARNING"):
+            self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_logged_in_visitors_bypass_the_cache(self):
+        self.client.get(self.url)
+        self.client.force_login(User.objects.create_user(username="cook", password="pw"))
+        response = self.client.get(self.url)
+        self.assertNotIn("X-Page-Cache", response)
+        self.assertContains(response, "Logout")
+
+    def test_only_one_request_regenerates_an_expired_page(self):
+        from recipe_app.page_cache import page_keys
+
+        self.client.get(self.url)
+        key, lock_key = page_keys(self.client.get(self.url).wsgi_request)
+        entry = cache.get(key)
+        entry["fresh_until"] = 0
+        cache.set(key, entry)
+
+        # Someone else holds the lock: serve the stale copy
+        cache.add(lock_key, True)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Page-Cache"], "stale")
+
+        cache.delete(lock_key)
+        self.assertEqual(self.client.get(self.url)["X-Page-Cache"], "miss")
+        self.assertEqual(self.client.get(self.url)["X-Page-Cache"], "hit")
+
+    def test_purged_page_waits_for_the_regenerating_request(self):
+        from recipe_app import page_cache
+
+        self.client.get(self.url)
+        key, lock_key = page_cache.page_keys(self.client.get(self.url).wsgi_request)
+        self.recipe.save()
+        cache.add(lock_key, True)
+        # The stale copy is never served once purged; give up waiting quickly
+        with mock.patch.object(page_cache, "LOCK_TIMEOUT", 0.1):
+            response = self.client.get(self.url)
+        self.assertNotIn("X-Page-Cache", response)
+        self.assertEqual(response.status_code, 200)
+
+    def test_recompute_difficulty_purges_every_recipe_page(self):
+        self.client.get(self.url)
+        Recipe.objects.filter(pk=self.recipe.pk).update(difficulty="")
+        call_command("recompute_difficulty", stdout=StringIO())
+        self.assertEqual(self.client.get(self.url)["X-Page-Cache"], "miss")
+
+    @override_settings(SHARED_CACHE=False)
+    def test_off_without_a_shared_cache(self):
+        response = self.client.get(self.url)
+        self.assertNotIn("X-Page-Cache", response)
+
+
+# ----------------- Without a shared cache -----------------
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    SHARED_CACHE=False,
+)
+class ProductionCacheQueriesTest(TestCase):
+    """The default configuration without REDIS_URL: nothing may cost extra queries."""
+
+    def setUp(self):
+        self.recipe = Recipe.objects.create(name="Toast", ingredients="Bread", cooking_time=5)
+        self.user = User.objects.create_user(username="cook", password="pw")
+
+    def test_query_counts(self):
+        detail = reverse("recipes:recipe_detail", args=[self.recipe.pk])
+        # ETag lookup + the recipe, on every visit (no page cache)
+        for _ in range(2):
+            with self.assertNumQueries(2):
+                response = self.client.get(detail)
+            self.assertNotIn("X-Page-Cache", response)
+
+        self.client.force_login(self.user)
+        # session + user + the user's favourite ids + insert
+        with self.assertNumQueries(4):
+            self.client.post(reverse("users:toggle_favourite", args=[self.recipe.pk]))
+        # session + user + ETag (recipe count rollup, latest update, favourites)
+        # + page + favourite ids
+        with self.assertNumQueries(7):
+            self.client.get(reverse("recipes:recipe_list"))
+
+
+# ----------------- Card fragment cache -----------------
+
+class RecipeCardCacheTest(TestCase):
+    def setUp(self):
+        card_cache.clear()
+        self.recipe = Recipe.objects.create(name="Toast", ingredients="Bread", cooking_time=5)
+        self.user = User.objects.create_user(username="cook", password="pw")
+        self.url = reverse("recipes:search_recipes")
+
+    def test_fragment_is_rendered_once_per_version(self):
+        from .templatetags import recipe_cards
+
+        with mock.patch.object(
+            recipe_cards, "render_to_string", wraps=recipe_cards.render_to_string
+        ) as render:
+            self.client.get(self.url)
+            self.client.force_login(self.user)
+            self.client.get(self.url)
+            self.assertEqual(render.call_count, 1)
+
+            self.recipe.name = "French Toast"
+            self.recipe.save()
+            self.assertContains(self.client.get(self.url), "French Toast")
+            self.assertEqual(render.call_count, 2)
+
+    def test_overlay_follows_user(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, "Login to add")
+        self.assertNotContains(response, "csrfmiddlewaretoken")
+
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertContains(response, 'data-favourite="0"')
+        self.assertNotContains(response, "Login to add")
+        self.assertNotContains(response, "__csrf_token__")
+        self.assertContains(response, 'name="csrfmiddlewaretoken" value="')
+
+        self.client.post(reverse("users:toggle_favourite", args=[self.recipe.pk]))
+        self.assertContains(self.client.get(self.url), 'data-favourite="1"')
+
+
+# ----------------- Request timing -----------------
+
+@override_settings(RECIPE_CHART_WORKERS=0)
+class RequestTimingTest(TestCase):
+    def setUp(self):
+        chart_cache.clear()
+        Recipe.objects.create(name="Toast", ingredients="Bread", cooking_time=5)
+
+    def test_server_timing_header_and_log_line(self):
+        with self.assertLogs("recipe_app.timing", "INFO") as logs:
+            response = self.client.get(reverse("recipes:advanced_search"), {"name": "toast"})
+        timing = response["Server-Timing"]
+        for entry in ("total;dur=", "db;dur=", "template;dur=", "query;dur=", "chart_bar;dur=", "chart_pie;dur="):
+            self.assertIn(entry, timing)
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn(f"path={reverse('recipes:advanced_search')} status=200", logs.output[0])
+        self.assertIn("chart_line_ms=", logs.output[0])
+        self.assertGreater(logs.records[0].timing["db_queries"], 0)
+
+    def test_spans_outside_requests_are_ignored(self):
+        from recipe_app import timing
+
+        with timing.span("anything"):
+            timing.record("chart_bar", 1.0)
+
+    def test_log_lines_are_written_outside_tests(self):
+        # A fresh process configures logging like the web server does
+        script = (
+            "import logging, django; django.setup(); "
+            "logging.getLogger('recipe_app.timing').info('method=GET path=/about/ status=200')"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True
+        ).stderr
+        self.assertIn("INFO recipe_app.timing method=GET path=/about/ status=200", output)
+
+
+# ----------------- Slow-query log -----------------
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG_SIZE=5)
+class SlowQueryLogTest(TestCase):
+    def setUp(self):
+        from recipe_app import slow_queries
+
+        self.slow_queries = slow_queries
+        Recipe.objects.create(name="Toast", ingredients="Bread", cooking_time=5)
+
+    @override_settings(SLOW_QUERY_LOG_SIZE=50)
+    def test_queries_are_logged_with_plan_and_view(self):
+        with self.assertLogs("recipe_app.slow_queries", "WARNING"):
+            self.client.get(reverse("recipes:advanced_search"), {"name": "toast"})
+        entries = self.slow_queries.entries()
+        entry = next(e for e in entries if "%toast%" in (e["params"] or []))
+        self.assertEqual(entry["view"], "recipes:advanced_search")
+        self.assertIn("name=toast", entry["url"])
+        self.assertTrue(entry["plan"])
+
+    def test_log_is_trimmed_on_read(self):
+        with self.assertLogs("recipe_app.slow_queries", "WARNING"):
+            for _ in range(3):
+                self.client.get(reverse("recipes:advanced_search"), {"name": "toast"})
+        newest = max(SlowQuery.objects.values_list("id", flat=True))
+        self.assertGreater(SlowQuery.objects.count(), 5)
+        entries = self.slow_queries.entries()
+        numbers = [e["number"] for e in entries]
+        self.assertEqual(numbers, sorted(numbers, reverse=True))
+        self.assertEqual(numbers[0], newest)
+        self.assertEqual(len(entries), 5)
+        self.assertEqual(SlowQuery.objects.count(), 5)
+        self.assertEqual(len(self.slow_queries.entries(limit=2)), 2)
+
+    def test_failed_write_does_not_break_the_request(self):
+        with self.assertLogs("recipe_app.slow_queries", "WARNING") as logs:
+            with mock.patch.object(self.slow_queries, "record", side_effect=RuntimeError):
+                response = self.client.get(reverse("recipes:advanced_search"), {"name": "toast"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Could not record slow queries", "\n".join(logs.output))
+
+    def test_admin_page_and_command(self):
+        user = User.objects.create_user(username="cook", password="pw")
+        self.client.force_login(user)
+        url = reverse("slow_queries")
+        with self.assertLogs("recipe_app.slow_queries", "WARNING"):
+            self.assertEqual(self.client.get(url).status_code, 302)
+            user.is_staff = True
+            user.save()
+            response = self.client.get(url)
+        self.assertContains(response, "Slow queries")
+
+        out = StringIO()
+        call_command("slow_queries", clear=True, stdout=out, stderr=StringIO())
+        self.assertIn("Plan:", out.getvalue())
+        self.assertEqual(self.slow_queries.entries(), [])
+
+
+# ----------------- Profiling -----------------
+
+class ProfilerMiddlewareTest(TestCase):
+    def setUp(self):
+        Recipe.objects.create(name="Toast", ingredients="Bread", cooking_time=5)
+        self.user = User.objects.create_user(username="cook", password="pw")
+        self.client.force_login(self.user)
+        self.url = reverse("recipes:recipe_list")
+
+    def test_ignored_for_non_staff(self):
+        response = self.client.get(self.url, {"profile": "1"})
+        self.assertContains(response, "Toast")
+
+    def test_false_values_do_not_profile(self):
+        self.user.is_staff = True
+        self.user.save()
+        for value in ("0", "false", "Off", ""):
+            with self.subTest(value):
+                self.assertContains(self.client.get(self.url, {"profile": value}), "Toast")
+
+    def test_database_c_functions_count_as_orm(self):
+        from recipe_app.profiling import area_for
+
+        self.assertEqual(area_for("~", 0, "<method 'execute' of 'sqlite3.Cursor' objects>"), "orm")
+        self.assertEqual(
+            area_for("~", 0, "<method 'execute' of 'psycopg2.extensions.cursor' objects>"), "orm"
+        )
+        self.assertEqual(area_for("~", 0, "<built-in method builtins.len>"), "other")
+
+    def test_staff_text_report_groups_time_by_area(self):
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(self.url, HTTP_X_PROFILE="1")
+        self.assertEqual(response["Content-Type"], "text/plain; charset=utf-8")
+        report = response.content.decode()
+        for area in ("orm", "templates", "pandas", "matplotlib", "other"):
+            self.assertIn(f"  {area} ", report)
+        self.assertIn("cumulative", report)
+
+    def test_staff_prof_download_loads_in_pstats(self):
+        import pstats
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(self.url, {"profile": "prof"})
+        self.assertIn(".prof", response["Content-Disposition"])
+        path = Path(tempfile.mkdtemp()) / "request.prof"
+        self.addCleanup(shutil.rmtree, path.parent)
+        path.write_bytes(response.content)
+        self.assertGreater(pstats.Stats(str(path)).total_calls, 0)
+
+
+# ----------------- Metrics -----------------
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        from recipe_app import metrics
+
+        self.metrics = metrics
+        metrics.REGISTRY.reset()
+        self.addCleanup(metrics.REGISTRY.reset)
+        Recipe.objects.create(name="Toast", ingredients="Bread", cooking_time=5)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_endpoint_requires_token_or_staff(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(
+            self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403
+        )
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("# TYPE recipe_request_duration_seconds histogram", response.content.decode())
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_request_latency_and_queries_per_view(self):
+        self.client.get(reverse("recipes:search_recipes"), {"q": "toast"})
+        body = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret").content.decode()
+        self.assertIn(
+            'recipe_request_duration_seconds_bucket{view="recipes:search_recipes",le="+Inf"} 1', body
+        )
+        self.assertIn('recipe_request_duration_seconds_count{view="recipes:search_recipes"} 1', body)
+        self.assertIn('recipe_requests_total{status="200",view="recipes:search_recipes"} 1', body)
+        self.assertRegex(body, r'recipe_db_queries_total\{view="recipes:search_recipes"\} [1-9]')
+        self.assertRegex(body, r'recipe_cache_lookups_total\{cache="cards",result="miss"\} 1')
+
+    def test_mmap_store_is_shared_between_processes(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(METRICS_DIR=str(directory)):
+            self.metrics.FAVOURITE_TOGGLES.inc(action="add")
+            # Another worker's file, with a key this process has and one it hasn't
+            other = self.metrics.MmapStore(directory / "metrics_999999.db")
+            other.inc('recipe_favourite_toggles_total{action="add"}', 2)
+            for i in range(3000):
+                other.inc(f'recipe_favourite_toggles_total{{action="x{i}"}}', 1)
+            samples = self.metrics.REGISTRY.collect()
+        self.assertEqual(samples['recipe_favourite_toggles_total{action="add"}'], 3)
+        self.assertEqual(samples['recipe_favourite_toggles_total{action="x2999"}'], 1)
+
+    def test_gunicorn_hooks_clear_the_directory_and_archive_dead_workers(self):
+        import runpy
+
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        hooks = runpy.run_path(str(Path(__file__).resolve().parent.parent / "gunicorn.conf.py"))
+        self.metrics.MmapStore(directory / "metrics_1.db").inc("left_over_total", 5)
+        with mock.patch.dict("os.environ", {"METRICS_DIR": str(directory)}):
+            hooks["on_starting"](None)
+            self.assertEqual(list(directory.iterdir()), [])
+
+            for pid in (101, 102):
+                self.metrics.MmapStore(directory / f"metrics_{pid}.db").inc("requests_total", 2)
+                hooks["child_exit"](None, mock.Mock(pid=pid))
+            hooks["child_exit"](None, mock.Mock(pid=103))  # never recorded anything
+
+        self.assertEqual([path.name for path in directory.iterdir()], ["metrics_archive.db"])
+        with override_settings(METRICS_DIR=str(directory)):
+            self.assertEqual(self.metrics.REGISTRY.collect(), {"requests_total": 4})
+
+
+class BenchCommandTest(TestCase):
+    def test_reports_each_view_as_json(self):
+        out = StringIO()
+        call_command(
+            "bench", size="30", users=2, iterations=2, warmup=0, in_place=True,
+            stdout=out, stderr=StringIO(),
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["size"], 30)
+        self.assertEqual(report["generated"]["recipes"], 30)
+        self.assertEqual(
+            set(report["views"]),
+            {"recipe_list", "recipe_detail", "header_search", "advanced_search", "favourite_toggle"},
+        )
+        for result in report["views"].values():
+            self.assertEqual(result["errors"], 0)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+            self.assertGreaterEqual(result["queries"]["max"], 1)
+            self.assertGreater(result["peak_alloc_mb"], 0)
+
+
+class LoadTestCommandTest(LiveServerTestCase):
+    def test_mix_parsing(self):
+        from .loadtest import parse_mix
+
+        self.assertEqual(parse_mix("browse=3, favourite"), {"browse": 3.0, "favourite": 1.0})
+        with self.assertRaises(ValueError):
+            parse_mix("browse=1,checkout=2")
+        with self.assertRaises(ValueError):
+            parse_mix("browse=0")
+
+    def test_refuses_a_production_like_database(self):
+        # Tests run with DEBUG off
+        with self.assertRaisesMessage(CommandError, "--i-know"):
+            call_command("loadtest", url=self.live_server_url, stdout=StringIO(), stderr=StringIO())
+
+    def test_concurrent_users_against_running_server(self):
+        from django.contrib.sessions.models import Session
+
+        out = StringIO()
+        call_command(
+            "loadtest", url=self.live_server_url, generate="20", concurrency=2, duration=1,
+            mix="browse=1,list=1,search=1,favourite=1", i_know=True, stdout=out, stderr=StringIO(),
+        )
+        report = json.loads(out.getvalue())
+        self.assertGreater(report["requests"], 0)
+        self.assertEqual(report["errors"], 0, report["statuses"])
+        self.assertEqual(report["concurrency"], 2)
+        self.assertLessEqual(report["p50_ms"], report["p99_ms"])
+        self.assertLessEqual(set(report["scenarios"]), {"browse", "list", "search", "favourite"})
+        # The benchmark accounts and their sessions are gone again
+        self.assertFalse(User.objects.filter(username__startswith="bench-user-").exists())
+        self.assertFalse(Session.objects.exists())
+
+
+# ----------------- Start-up imports -----------------
+
+class LazyImportTest(TestCase):
+    def test_boot_does_not_import_pandas_or_matplotlib(self):
+        script = (
+            "import sys, django; django.setup(); "
+            "from django.urls import get_resolver; get_resolver().url_patterns; "
+            "from django.core.handlers.wsgi import WSGIHandler; WSGIHandler(); "
+            "print(sorted(m for m in ('pandas', 'matplotlib', 'cProfile', 'pstats') if m in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip(), "[]")
+
+
 # ----------------- Forms -----------------
 
 class RecipeFormTest(TestCase):
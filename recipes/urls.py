@@ -1,5 +1,8 @@
 from django.urls import path
-from .views import RecipeListView, RecipeDetailView, welcome, header_search, advanced_search
+from .views import (
+    RecipeListView, RecipeDetailView, welcome, header_search, advanced_search,
+    advanced_search_analytics,
+)
 
 app_name = "recipes"
 
@@ -15,4 +18,5 @@ urlpatterns = [
     # Search views
     path("", header_search, name="search_recipes"),  # root → quick header search
     path("advanced_search/", advanced_search, name="advanced_search"),
+    path("advanced_search/analytics/", advanced_search_analytics, name="advanced_search_analytics"),
 ]
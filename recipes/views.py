@@ -1,45 +1,73 @@
 from django.shortcuts import render
+from django.http import JsonResponse
 from .models import Recipe
+from .search import get_search_backend
+from .pagination import paginate_keyset, render_card_page
+from .cache import (
+    CHART_RETRY_SECONDS, CachedCharts, chart_cache, chart_cache_key, get_recipe_page_version,
+)
+from .export import export_response, requested_format
+from .conditional import recipe_detail_condition, recipe_list_condition
+from .analytics import recipe_analytics
+from .stats import catalogue_analytics
 from django.views.generic import ListView, DetailView
+from django.utils.decorators import method_decorator
 from django.contrib.auth.mixins import LoginRequiredMixin
 from .forms import AdvancedSearchForm
-from django.db.models import Q
-from users.models import Favourite
+from users.cache import get_favourite_ids
+from recipe_app import timing
+from recipe_app.page_cache import cache_anonymous_page
 
-# Matplotlib imports for charts (non-GUI backend for server environments)
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-from io import BytesIO
-import base64
-import pandas as pd
+# matplotlib is only imported by recipes.charts, in the chart workers
+from .chart_pool import CHART_KINDS, render_charts
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 
 # Welcome / landing page
+@cache_anonymous_page()
 def welcome(request):
     return render(request, "recipes/welcome.html")
 
 
-# Show all recipes in the main page (requires login)
+# Show all recipes in the main page (requires login), one keyset page at a time.
+# Unchanged pages (same catalogue and favourites) are answered with 304.
+@method_decorator(recipe_list_condition, name="get")
 class RecipeListView(LoginRequiredMixin, ListView):
     model = Recipe
     template_name = "recipes/main.html"
+    fragment_template_name = "recipes/recipe_cards.html"
     context_object_name = "recipes"
+    ordering = ("name", "id")
+
+    def get_queryset(self):
+        # Only the columns the recipe card renders
+        return super().get_queryset().only(*Recipe.CARD_FIELDS)
+
+    def get_template_names(self):
+        """Serve only the cards when the infinite-scroll script asks for more."""
+        if self.request.GET.get("fragment"):
+            return [self.fragment_template_name]
+        return [self.template_name]
 
     def get_context_data(self, **kwargs):
-        """Add favourite recipe IDs for the logged-in user."""
-        context = super().get_context_data(**kwargs)
-        if self.request.user.is_authenticated:
-            context["fav_ids"] = set(
-                Favourite.objects.filter(user=self.request.user)
-                .values_list("recipe_id", flat=True)
-            )
-        else:
-            context["fav_ids"] = set()
+        """Add the current page and favourite recipe IDs for the logged-in user."""
+        page = paginate_keyset(self.request, self.object_list, self.ordering)
+        context = super().get_context_data(object_list=page.items, **kwargs)
+        context["page"] = page
+        context["fav_ids"] = get_favourite_ids(self.request.user)
         return context
 
 
-# Show detailed view of a single recipe
+# Show detailed view of a single recipe (304 when the recipe is unchanged);
+# anonymous visitors get it from the page cache until the recipe changes
+@method_decorator(recipe_detail_condition, name="get")
+@method_decorator(
+    cache_anonymous_page(version=lambda request, pk: get_recipe_page_version(pk)),
+    name="dispatch",
+)
 class RecipeDetailView(DetailView):
     model = Recipe
     template_name = "recipes/details.html"
@@ -61,40 +89,48 @@ def header_search(request):
     query = request.GET.get("q", "")
     meal_type = request.GET.get("meal_type", "all")
 
-    recipes = Recipe.objects.all()
+    recipes = Recipe.objects.only(*Recipe.CARD_FIELDS)
 
-    # Apply text search (name OR ingredients)
+    # Apply full-text search (name OR ingredients), ranked by relevance
+    ordering = ("name", "id")
     if query:
-        recipes = recipes.filter(
-            Q(name__icontains=query) | Q(ingredients__icontains=query)
-        )
+        recipes = get_search_backend().search(recipes, query)
+        ordering = ("-search_rank", "id")
 
     # Filter by meal type if specified
     if meal_type and meal_type != "all":
         recipes = recipes.filter(meal_type=meal_type)
 
-    # Add user's favourites to context
-    fav_ids = set()
-    if request.user.is_authenticated:
-        fav_ids = set(
-            Favourite.objects.filter(user=request.user)
-            .values_list("recipe_id", flat=True)
-        )
+    # ?format=csv|jsonl streams every match instead of rendering a page
+    export_format = requested_format(request)
+    if export_format:
+        return export_response(recipes.order_by(*ordering), export_format, "search_results")
+
+    # Add user's favourites to context (cached per user)
+    fav_ids = get_favourite_ids(request.user)
 
-    return render(
+    with timing.span("search"):
+        page = paginate_keyset(request, recipes, ordering)
+    return render_card_page(
         request,
         "recipes/search_results.html",
-        {"recipes": recipes, "fav_ids": fav_ids},
+        "recipes/search_result_cards.html",
+        {"recipes": page.items, "fav_ids": fav_ids},
+        page,
     )
 
 
-# Advanced search with multiple filters + charts
-def advanced_search(request):
-    form = AdvancedSearchForm(request.GET or None)
+def filter_recipes(form, request):
+    """
+    Apply the AdvancedSearchForm filters. Returns the filtered queryset
+    and the cleaned filters ({} when nothing valid was submitted).
+    """
     recipes = Recipe.objects.all()
+    filters = {}
 
     # Apply filters if form is valid and user submitted values
     if form.is_valid() and request.GET:
+        filters = form.cleaned_data
         name = form.cleaned_data.get("name")
         ingredient = form.cleaned_data.get("ingredient")
         meal_type = form.cleaned_data.get("meal_type")
@@ -104,7 +140,7 @@ def advanced_search(request):
         if name:
             recipes = recipes.filter(name__icontains=name)
         if ingredient:
-            recipes = recipes.filter(ingredients__icontains=ingredient)
+            recipes = recipes.with_ingredient(ingredient)
         if meal_type and meal_type != "all":
             recipes = recipes.filter(meal_type=meal_type)
         if difficulty:
@@ -112,82 +148,66 @@ def advanced_search(request):
         if max_time is not None:
             recipes = recipes.filter(cooking_time__lte=max_time)
 
-    # Generate DataFrame for displaying results in table format
-    chart_bar = chart_pie = chart_line = None
-    df_html = None
-    if recipes.exists():
-        df = pd.DataFrame(
-            list(
-                recipes.values(
-                    "id", "name", "ingredients", "meal_type", "difficulty", "cooking_time"
-                )
-            )
-        )
-        # Make recipe name clickable (link to detail view)
-        df["name"] = df.apply(
-            lambda row: f'<a href="/recipes/{row["id"]}/">{row["name"]}</a>', axis=1
-        )
-        df_html = df.to_html(classes="advanced-table-search", index=False, escape=False)
+    return recipes, filters
 
-    # Generate charts (only if recipes are found)
-    if recipes.exists():
-        df = pd.DataFrame(
-            list(recipes.values("id", "name", "meal_type", "cooking_time", "difficulty"))
-        )
 
-        # --- Bar chart: recipes per meal type ---
-        meal_counts = df["meal_type"].value_counts()
-        fig1, ax1 = plt.subplots()
-        ax1.bar(meal_counts.index.astype(str), meal_counts.values, color="#2c6f2c")
-        ax1.set_title("Recipes per Meal Type")
-        ax1.set_xlabel("Meal Type")
-        ax1.set_ylabel("Number of Recipes")
-        fig1.tight_layout()
-        buf = BytesIO()
-        fig1.savefig(buf, format="png", bbox_inches="tight")
-        chart_bar = base64.b64encode(buf.getvalue()).decode("utf-8")
-        buf.close()
-        plt.close(fig1)
-
-        # --- Pie chart: difficulty distribution ---
-        diff_counts = df["difficulty"].value_counts()
-        fig2, ax2 = plt.subplots()
-        ax2.pie(diff_counts.values, labels=diff_counts.index.astype(str), autopct="%1.1f%%", startangle=140)
-        ax2.set_title("Recipe Difficulty Distribution")
-        fig2.tight_layout()
-        buf = BytesIO()
-        fig2.savefig(buf, format="png", bbox_inches="tight")
-        chart_pie = base64.b64encode(buf.getvalue()).decode("utf-8")
-        buf.close()
-        plt.close(fig2)
-
-        # --- Line chart: cooking time per recipe (sorted) ---
-        df_sorted = df.sort_values("cooking_time")
-        fig3, ax3 = plt.subplots()
-        ax3.plot(df_sorted["name"].astype(str), df_sorted["cooking_time"], marker="o", linestyle="-", color="#CBA135")
-        ax3.set_title("Cooking Time per Recipe")
-        ax3.set_xlabel("Recipe")
-        ax3.set_ylabel("Cooking Time (min)")
-        ax3.tick_params(axis="x", rotation=45, labelsize=8)
-        fig3.tight_layout()
-        buf = BytesIO()
-        fig3.savefig(buf, format="png", bbox_inches="tight")
-        chart_line = base64.b64encode(buf.getvalue()).decode("utf-8")
-        buf.close()
-        plt.close(fig3)
-
-    # TODO: Replace print() with proper logging before production
+# Advanced search with multiple filters + charts
+def advanced_search(request):
+    form = AdvancedSearchForm(request.GET or None)
+    recipes, filters = filter_recipes(form, request)
+
+    # ?format=csv|jsonl streams every match instead of rendering the table
+    export_format = requested_format(request)
+    if export_format:
+        return export_response(recipes.order_by("id"), export_format, "advanced_search")
+
+    # Single pass: fetch only the columns the table and charts need, once,
+    # and feed the table, the charts and the count from that one result
+    with timing.span("query"):
+        rows = list(recipes.values("id", "name", "meal_type", "cooking_time", "difficulty"))
+
+    # Generate charts (only if recipes are found); repeat searches hit the cache.
+    # The three charts render in parallel in the chart worker pool; any that
+    # time out come back as None and show a placeholder. Partial results are
+    # cached too, and only the missing charts are retried, after a while.
+    chart_bar = chart_pie = chart_line = None
+    show_charts = bool(rows)
+    if show_charts:
+        key = chart_cache_key(filters)
+        cached = chart_cache.get(key)
+        charts = cached.charts if cached else (None, None, None)
+        missing = [kind for kind, chart in zip(CHART_KINDS, charts) if chart is None]
+        if missing and (cached is None or cached.retry_at <= time.monotonic()):
+            with timing.span("charts"):
+                rendered = render_charts(rows, kinds=missing)
+            charts = tuple(chart or new for chart, new in zip(charts, rendered))
+            chart_cache.set(key, CachedCharts(charts, time.monotonic() + CHART_RETRY_SECONDS))
+        chart_bar, chart_pie, chart_line = charts
+
     if request.GET:
-        print("Form valid:", form.is_valid())
-        print("Cleaned data:", form.cleaned_data)
-        print("Queryset count:", recipes.count())
+        logger.debug(
+            "Advanced search: valid=%s filters=%s results=%d",
+            form.is_valid(), filters, len(rows),
+        )
 
     context = {
         "form": form,
-        "recipes": recipes,
+        "recipes": rows,
         "chart_bar": chart_bar,
         "chart_pie": chart_pie,
         "chart_line": chart_line,
-        "df_html": df_html,
+        "show_charts": show_charts,
     }
     return render(request, "recipes/advanced_search.html", context)
+
+
+# JSON data for the advanced-search charts, aggregated in the database
+def advanced_search_analytics(request):
+    form = AdvancedSearchForm(request.GET or None)
+    if request.GET and not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    recipes, filters = filter_recipes(form, request)
+    if not any(value not in (None, "", "all") for value in filters.values()):
+        # Unfiltered: read the incrementally maintained rollup instead of scanning
+        return JsonResponse(catalogue_analytics())
+    return JsonResponse(recipe_analytics(recipes))
@@ -3,4 +3,8 @@ from .models import Favourite
 
 # Register your models here.
 
-admin.site.register(Favourite)
\ No newline at end of file
+
+@admin.register(Favourite)
+class FavouriteAdmin(admin.ModelAdmin):
+    # __str__ reads user.username and recipe.name; fetch both with the row
+    list_select_related = ("user", "recipe")
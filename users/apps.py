@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class FavouritesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        # Register signal handlers that keep the favourites cache in sync
+        from . import signals  # noqa: F401
@@ -0,0 +1,112 @@
+"""
+Per-user favourite recipe IDs, cached as a compact sorted integer array.
+
+Every cached set is stored together with the user's favourites version.
+Adding or removing a favourite bumps the version and writes the set,
+reloaded after the bump, through to the cache; a reader that finds a
+set whose version does not match the current one rebuilds it from the
+database, so a stale set is never served.
+
+Without a shared cache (SHARED_CACHE) the set is read from the database
+on every request: one indexed query, cheaper than keeping it in step.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from recipe_app import metrics
+from recipes.cache import bump_version, get_version, shared_cache
+
+from .models import Favourite
+
+# Typecode for 64-bit ids (BigAutoField)
+ID_TYPECODE = "q"
+
+
+def set_key(user_id):
+    return f"users:favourites:{user_id}"
+
+
+def version_key(user_id):
+    return f"users:favourites:version:{user_id}"
+
+
+class FavouriteIds:
+    """Read-only sorted id array supporting ``recipe.id in fav_ids`` via bisect."""
+
+    __slots__ = ("ids",)
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def __contains__(self, recipe_id):
+        index = bisect_left(self.ids, recipe_id)
+        return index < len(self.ids) and self.ids[index] == recipe_id
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def load_ids(user_id):
+    return array(
+        ID_TYPECODE,
+        Favourite.objects.filter(user_id=user_id)
+        .order_by("recipe_id")
+        .values_list("recipe_id", flat=True),
+    )
+
+
+def store(user_id, version, ids):
+    cache.set(set_key(user_id), (version, ids.tobytes()), timeout=None)
+
+
+def get_favourite_ids(user):
+    """FavouriteIds for ``user`` (empty for anonymous users)."""
+    if not user.is_authenticated:
+        return FavouriteIds(array(ID_TYPECODE))
+    if not shared_cache():
+        return FavouriteIds(load_ids(user.pk))
+    version = get_version(version_key(user.pk))
+    cached = cache.get(set_key(user.pk))
+    hit = cached is not None and cached[0] == version
+    metrics.cache_lookup("favourite_ids", hit)
+    if hit:
+        ids = array(ID_TYPECODE)
+        ids.frombytes(cached[1])
+        return FavouriteIds(ids)
+    ids = load_ids(user.pk)
+    store(user.pk, version, ids)
+    return FavouriteIds(ids)
+
+
+def get_favourites_version(user_id):
+    """
+    Current version of ``user_id``'s favourites (changes on every add or
+    remove). Without a shared cache it comes from the database: the
+    count and the latest id (ids only grow), on the user index.
+    """
+    if shared_cache():
+        return get_version(version_key(user_id))
+    favourites = Favourite.objects.filter(user_id=user_id).aggregate(
+        count=Count("id"), latest=Max("id")
+    )
+    return f"{favourites['count']}-{favourites['latest']}"
+
+
+def write_through(user_id):
+    """
+    Record a favourite added or removed for ``user_id`` after the
+    database write. The set is reloaded (one indexed query) after the version is
+    bumped rather than patched in place: a patch of the cached copy can
+    miss a concurrent write from another worker, while a reload after
+    the bump sees every write whose bump came before it.
+    """
+    if not shared_cache():
+        return
+    version = bump_version(version_key(user_id))
+    store(user_id, version, load_ids(user_id))
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import write_through
+from .models import Favourite
+
+
+# Write favourite changes through to the cached per-user id sets
+@receiver(post_save, sender=Favourite)
+def cache_favourite_added(sender, instance, created, **kwargs):
+    if created:
+        write_through(instance.user_id)
+
+
+@receiver(post_delete, sender=Favourite)
+def cache_favourite_removed(sender, instance, **kwargs):
+    write_through(instance.user_id)
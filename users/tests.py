@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth.models import User
 from recipes.models import Recipe
@@ -7,6 +7,17 @@ from .forms import UserProfileForm
 from django.core.exceptions import ValidationError
 from django.contrib.auth.password_validation import validate_password
 from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from .cache import get_favourite_ids, set_key
+
+# For the features that need a cache shared by every process (SHARED_CACHE,
+# Redis in production): in the single test process a local cache is shared
+shared_cache = override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    SHARED_CACHE=True,
+)
 
 
 class FavouritesViewTest(TestCase):
@@ -41,6 +52,111 @@ class FavouritesViewTest(TestCase):
         self.assertContains(response, "Pasta")
 
 
+@shared_cache
+class FavouriteIdsCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.login(username="tester", password="secret")
+        self.recipes = [
+            Recipe.objects.create(name=f"Dish {i}", ingredients="Salt", cooking_time=5)
+            for i in range(3)
+        ]
+
+    def test_cached_after_first_use(self):
+        Favourite.objects.create(user=self.user, recipe=self.recipes[1])
+        self.assertIn(self.recipes[1].id, get_favourite_ids(self.user))
+        with self.assertNumQueries(0):
+            fav_ids = get_favourite_ids(self.user)
+        self.assertEqual(list(fav_ids), [self.recipes[1].id])
+        self.assertNotIn(self.recipes[0].id, fav_ids)
+
+    def test_add_and_remove_write_through(self):
+        get_favourite_ids(self.user)
+        self.client.get(reverse("users:add_favourite", args=[self.recipes[2].id]))
+        self.client.get(reverse("users:add_favourite", args=[self.recipes[0].id]))
+        with self.assertNumQueries(0):
+            self.assertEqual(list(get_favourite_ids(self.user)), [self.recipes[0].id, self.recipes[2].id])
+        self.client.get(reverse("users:remove_favourite", args=[self.recipes[2].id]))
+        with self.assertNumQueries(0):
+            self.assertEqual(list(get_favourite_ids(self.user)), [self.recipes[0].id])
+
+    def test_stale_set_is_never_served(self):
+        get_favourite_ids(self.user)
+        version, ids = cache.get(set_key(self.user.pk))
+        Favourite.objects.create(user=self.user, recipe=self.recipes[0])
+        # Simulate a lost write-through: put the old set back
+        cache.set(set_key(self.user.pk), (version, ids))
+        self.assertIn(self.recipes[0].id, get_favourite_ids(self.user))
+
+
+class ToggleFavouriteTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.login(username="tester", password="secret")
+        self.recipe = Recipe.objects.create(name="Pasta", ingredients="Noodles", cooking_time=10)
+        self.url = reverse("users:toggle_favourite", args=[self.recipe.id])
+
+    def test_set_is_idempotent(self):
+        for _ in range(2):
+            response = self.client.post(self.url, {"favourite": "1"})
+            self.assertEqual(response.json(), {"recipe_id": self.recipe.id, "favourite": True})
+        self.assertEqual(Favourite.objects.filter(user=self.user).count(), 1)
+        self.assertIn(self.recipe.id, get_favourite_ids(self.user))
+
+    def test_toggle_flips_state(self):
+        self.assertTrue(self.client.post(self.url).json()["favourite"])
+        self.assertFalse(self.client.post(self.url).json()["favourite"])
+        self.assertFalse(Favourite.objects.filter(user=self.user).exists())
+        self.assertNotIn(self.recipe.id, get_favourite_ids(self.user))
+
+    def test_get_not_allowed(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+    def test_unknown_recipe(self):
+        response = self.client.post(reverse("users:toggle_favourite", args=[999]), {"favourite": "1"})
+        self.assertEqual(response.status_code, 404)
+
+
+@shared_cache
+class ListingQueryCountTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.login(username="tester", password="secret")
+
+    def add_recipes(self, count):
+        for i in range(count):
+            recipe = Recipe.objects.create(
+                name=f"Dish {i}", ingredients="Salt", cooking_time=5, created_by=self.user
+            )
+            Favourite.objects.create(user=self.user, recipe=recipe)
+
+    def query_count(self, url_name):
+        # Warm the favourites cache so only the page itself is measured
+        self.client.get(reverse(url_name))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_constant_queries_regardless_of_size(self):
+        for url_name in ("users:user_favourites", "users:my_recipes"):
+            self.add_recipes(2)
+            small = self.query_count(url_name)
+            self.add_recipes(10)
+            self.assertEqual(self.query_count(url_name), small, url_name)
+            # session + user + one page query
+            self.assertLessEqual(small, 3, url_name)
+
+    def test_favourites_page_marks_cards_as_favourites(self):
+        self.add_recipes(1)
+        response = self.client.get(reverse("users:user_favourites"))
+        self.assertContains(response, "Remove from Favourites")
+        self.assertNotContains(response, "Add to Favourites")
+
+
 class UserProfileTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="tester", password="secret", email="old@mail.com")
@@ -8,6 +8,7 @@ urlpatterns = [
     path('profile/', views.profile, name='profile'),
     path('favourites/add/<int:recipe_id>/', views.add_favourite, name='add_favourite'),
     path('favourites/remove/<int:recipe_id>/', views.remove_favourite, name='remove_favourite'),
+    path('favourites/toggle/<int:recipe_id>/', views.toggle_favourite, name='toggle_favourite'),
     path('favourites/', views.user_favourites, name='user_favourites'),
     path('my-recipes/', views.my_recipes, name='my_recipes'),
     path('add-recipe/', views.add_recipe, name='add_recipe'),
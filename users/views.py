@@ -1,8 +1,14 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.db import connection
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_POST
 from .models import Favourite
+from .cache import get_favourite_ids, write_through
 from recipes.models import Recipe
 from recipes.forms import RecipeForm
+from recipes.pagination import paginate_keyset, render_card_page
+from recipe_app import metrics
 from django.contrib.auth.hashers import make_password
 from .forms import UserProfileForm
 from django.contrib import messages
@@ -86,10 +92,61 @@ def remove_favourite(request, recipe_id):
     return redirect("recipes:recipe_list")
 
 
+@login_required
+@require_POST
+def toggle_favourite(request, recipe_id):
+    """
+    Set or toggle one favourite and answer with a small JSON body.
+    POST favourite=1 / favourite=0 sets the state; without it the current
+    state (read from the cached favourite ids) is flipped. Adding is a
+    single INSERT ... ON CONFLICT DO NOTHING, removing a single DELETE;
+    signals are bypassed, so the cache is written through explicitly.
+    """
+    wanted = request.POST.get("favourite")
+    if wanted is None:
+        favourite = recipe_id not in get_favourite_ids(request.user)
+    else:
+        favourite = wanted in ("1", "true", "on")
+
+    table = Favourite._meta.db_table
+    with connection.cursor() as cursor:
+        if favourite:
+            # Selecting from the recipe table skips unknown recipe ids
+            cursor.execute(
+                f"INSERT INTO {table} (user_id, recipe_id, pic) "
+                f"SELECT %s, id, %s FROM {Recipe._meta.db_table} WHERE id = %s "
+                "ON CONFLICT (user_id, recipe_id) DO NOTHING",
+                [request.user.pk, Favourite._meta.get_field("pic").get_default(), recipe_id],
+            )
+            if cursor.rowcount == 0 and not Recipe.objects.filter(pk=recipe_id).exists():
+                raise Http404("Recipe not found.")
+        else:
+            # Plain DELETE; Favourite's delete signals would first SELECT the row
+            cursor.execute(
+                f"DELETE FROM {table} WHERE user_id = %s AND recipe_id = %s",
+                [request.user.pk, recipe_id],
+            )
+    write_through(request.user.pk)
+    metrics.FAVOURITE_TOGGLES.inc(action="add" if favourite else "remove")
+    return JsonResponse({"recipe_id": recipe_id, "favourite": favourite})
+
+
 @login_required
 def user_favourites(request):
-    favourites = Favourite.objects.filter(user=request.user)
-    return render(request, "users/user_favourites.html", {"favourites": favourites})
+    # One query for the page: the recipe comes along via JOIN, card columns only
+    favourites = (
+        Favourite.objects.filter(user=request.user)
+        .select_related("recipe")
+        .only("id", "recipe", *(f"recipe__{field}" for field in Recipe.CARD_FIELDS))
+    )
+    page = paginate_keyset(request, favourites, ("id",))
+    return render_card_page(
+        request,
+        "users/user_favourites.html",
+        "users/favourite_cards.html",
+        {"favourites": page.items, "fav_ids": get_favourite_ids(request.user)},
+        page,
+    )
 
 
 # Profile
@@ -101,8 +158,15 @@ def profile(request):
 # User recipes
 @login_required
 def my_recipes(request):
-    recipes = Recipe.objects.filter(created_by=request.user)
-    return render(request, "users/my_recipes.html", {"recipes": recipes})
+    recipes = Recipe.objects.filter(created_by=request.user).only(*Recipe.CARD_FIELDS)
+    page = paginate_keyset(request, recipes, ("id",))
+    return render_card_page(
+        request,
+        "users/my_recipes.html",
+        "users/my_recipe_cards.html",
+        {"recipes": page.items, "fav_ids": get_favourite_ids(request.user)},
+        page,
+    )
 
 
 @login_required